@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def inline_background_tasks(settings):
+    """Фоновые задачи в тестах выполняются сразу, без пула потоков."""
+    settings.BACKGROUND_WORKERS = 0
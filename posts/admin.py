@@ -1,16 +1,131 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+from django.core.exceptions import PermissionDenied
+from django.http import StreamingHttpResponse
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
 
+from .deletion import delete_in_background, deletion_summary, get_progress
+from .export import (FORMATS, export_lines, export_queryset,
+                     kind_for_model)
 from .models import Post, Group, Comment, Follow
+from .search import filter_posts
 
+User = get_user_model()
 
-class PostAdmin(admin.ModelAdmin):
+
+class BackgroundDeleteMixin:
+    """
+    Удаление из админки уходит в фон.
+
+    Страница подтверждения показывает только счётчики прямых зависимых
+    записей, а само удаление с каскадом идёт пачками в фоновой задаче,
+    не задерживая запрос и не блокируя базу. Ход удаления показывает
+    страница <id>/deletion/, ссылка на неё приходит в сообщении.
+    """
+
+    def get_deleted_objects(self, objs, request):
+        """
+        Сводка и недостающие права для страницы подтверждения.
+
+        Как и в самой админке, право на удаление нужно только для
+        моделей, зарегистрированных в ней: служебные записи вроде
+        UserStats и FeedEntry удаляются вместе с владельцем.
+        """
+        counts = deletion_summary(objs)
+        registry = self.admin_site._registry
+        perms_needed = {
+            model._meta.verbose_name for model in counts
+            if model in registry
+            and not registry[model].has_delete_permission(request)
+        }
+        model_count = {model._meta.verbose_name_plural: count
+                       for model, count in counts.items()}
+        return [str(obj) for obj in objs], model_count, perms_needed, []
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path('<path:object_id>/deletion/',
+                 self.admin_site.admin_view(self.deletion_view),
+                 name='%s_%s_deletion' % info),
+            *super().get_urls(),
+        ]
+
+    def deletion_url(self, obj):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return reverse('admin:%s_%s_deletion' % info,
+                       args=[obj.pk], current_app=self.admin_site.name)
+
+    def deletion_view(self, request, object_id):
+        """Ход фонового удаления объекта (см. deletion.get_progress)."""
+        if not self.has_delete_permission(request):
+            raise PermissionDenied
+        context = {
+            **self.admin_site.each_context(request),
+            'title': f'Удаление {self.model._meta.verbose_name} '
+                     f'#{object_id}',
+            'opts': self.model._meta,
+            'progress': get_progress(self.model, object_id),
+        }
+        return TemplateResponse(request, 'admin/deletion_progress.html',
+                                context)
+
+    def delete_model(self, request, obj):
+        delete_in_background(obj)
+        self.message_user(request, format_html(
+            '«{}» удаляется в фоне: <a href="{}">ход удаления</a>.',
+            obj, self.deletion_url(obj)), messages.INFO)
+
+    def delete_queryset(self, request, queryset):
+        objs = list(queryset)
+        for obj in objs:
+            delete_in_background(obj)
+        self.message_user(request, format_html(
+            'Выбранные объекты удаляются в фоне, ход удаления: {}.',
+            format_html_join(', ', '<a href="{}">{}</a>',
+                             ((self.deletion_url(obj), obj)
+                              for obj in objs))), messages.INFO)
+
+
+def export_action(fmt):
+    """Действие админки, отдающее выбранные строки файлом потоком."""
+    def action(modeladmin, request, queryset):
+        kind = kind_for_model(modeladmin.model)
+        lines = export_lines(kind, fmt,
+                             export_queryset(kind, queryset=queryset))
+        response = StreamingHttpResponse(lines,
+                                         content_type=FORMATS[fmt][1])
+        response['Content-Disposition'] = (
+            f'attachment; filename="{kind}.{fmt}"')
+        return response
+
+    action.__name__ = f'export_{fmt}'
+    action.short_description = f'Выгрузить в {fmt.upper()}'
+    return action
+
+
+export_ndjson = export_action('ndjson')
+export_csv = export_action('csv')
+
+
+class PostAdmin(BackgroundDeleteMixin, admin.ModelAdmin):
+    actions = (export_ndjson, export_csv)
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет посты по полнотекстовому индексу, а не LIKE по таблице."""
+        if not search_term:
+            return queryset, False
+        return filter_posts(queryset, search_term), False
+
 
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(BackgroundDeleteMixin, admin.ModelAdmin):
     list_display = ('title', 'slug', 'description')
     search_fields = ('title',)
     list_filter = ('title',)
@@ -18,13 +133,19 @@ class GroupAdmin(admin.ModelAdmin):
 
 
 class CommentAdmin(admin.ModelAdmin):
+    actions = (export_ndjson, export_csv)
     list_display = ('pk', 'text', 'author', 'post', 'created')
     search_fields = ('text',)
     list_filter = ('created',)
     empty_value_display = '-пусто-'
 
 
+class BackgroundDeleteUserAdmin(BackgroundDeleteMixin, UserAdmin):
+    pass
+
+
 class FollowAdmin(admin.ModelAdmin):
+    actions = (export_ndjson, export_csv)
     list_display = ('user', 'author')
     search_fields = ('user', 'author')
     list_filter = ('user', 'author')
@@ -35,3 +156,5 @@ admin.site.register(Follow, FollowAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
+admin.site.unregister(User)
+admin.site.register(User, BackgroundDeleteUserAdmin)
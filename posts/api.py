@@ -0,0 +1,208 @@
+import json
+from functools import partial, wraps
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+
+from .follows import import_follows, user_ids
+from .models import Group, Post
+from .pagination import CursorPaginator
+from .thumbnails import attach_thumbnails
+from .timeline import entry_posts, user_timeline
+from .views import COUNT_PAGE_COMMENTS, COUNT_PAGE_POSTS
+
+User = get_user_model()
+MAX_LIMIT = 100
+MAX_IMPORT = 10000
+
+# Поля поста, которые клиент может запросить через ?fields=
+POST_FIELDS = {
+    'id': lambda post: post.pk,
+    'text': lambda post: post.text,
+    'pub_date': lambda post: post.pub_date,
+    'author': lambda post: post.author.username,
+    'group': lambda post: post.group.slug if post.group_id else None,
+    'image': lambda post: post.image.url if post.image else None,
+    'thumbnail': lambda post: getattr(post, 'thumbnail_url', None),
+    'comment_count': lambda post: post.comment_count,
+}
+DEFAULT_FIELDS = ('id', 'text', 'pub_date', 'author', 'group', 'image',
+                  'comment_count')
+COMMENT_FIELDS = {
+    'id': lambda comment: comment.pk,
+    'text': lambda comment: comment.text,
+    'created': lambda comment: comment.created,
+    'author': lambda comment: comment.author.username,
+}
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def api_view(view=None, methods=('GET',)):
+    """Отдаёт ошибки вью клиенту в JSON, а не HTML-страницей."""
+    if view is None:
+        return partial(api_view, methods=methods)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in methods:
+            return JsonResponse({'detail': 'Метод не поддерживается'},
+                                status=405)
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse({'detail': str(error)}, status=error.status)
+        except Http404:
+            return JsonResponse({'detail': 'Не найдено'}, status=404)
+    return wrapper
+
+
+def dumps(value):
+    return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def requested_fields(request):
+    """Разбирает ?fields=id,text в список известных полей поста."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return DEFAULT_FIELDS
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = set(fields) - set(POST_FIELDS)
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(sorted(unknown))}')
+    return fields
+
+
+def requested_limit(request, default):
+    try:
+        limit = int(request.GET.get('limit', default))
+    except ValueError:
+        raise ApiError('limit должен быть числом')
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(f'limit должен быть от 1 до {MAX_LIMIT}')
+    return limit
+
+
+def serialize(obj, fields, serializers):
+    return {field: serializers[field](obj) for field in fields}
+
+
+def stream_page(page, fields, serializers, head=None):
+    """
+    Пишет страницу курсора в JSON по одному объекту.
+
+    Ответ не собирается в памяти целиком: каждый объект сериализуется
+    и отдаётся клиенту сразу, курсоры соседних страниц идут в конце.
+    """
+    yield '{'
+    if head:
+        yield ', '.join(f'{dumps(key)}: {dumps(value)}'
+                        for key, value in head.items()) + ', '
+    yield '"results": ['
+    for num, obj in enumerate(page):
+        yield (', ' if num else '') + dumps(serialize(obj, fields,
+                                                      serializers))
+    yield (f'], "next": {dumps(page.next_cursor)}, '
+           f'"previous": {dumps(page.previous_cursor)}}}')
+
+
+def post_list_response(request, post_list, tiebreak='pk', load=None):
+    """
+    Страница постов по курсорам ?after= и ?before= в потоке JSON.
+
+    load и tiebreak — как у views.paginate, для ленты из записей FeedEntry.
+    """
+    fields = requested_fields(request)
+    paginator = CursorPaginator(
+        post_list, requested_limit(request, COUNT_PAGE_POSTS),
+        tiebreak=tiebreak)
+    page = paginator.get_page(after=request.GET.get('after'),
+                              before=request.GET.get('before'))
+    if load is not None:
+        page.object_list = load(page.object_list)
+    if 'thumbnail' in fields:
+        attach_thumbnails(page.object_list)
+    return StreamingHttpResponse(stream_page(page, fields, POST_FIELDS),
+                                 content_type='application/json')
+
+
+@api_view
+def index(request):
+    """Все посты, новые сверху."""
+    return post_list_response(request, Post.objects.for_feed())
+
+
+@api_view
+def group_posts(request, slug):
+    """Посты группы."""
+    group = get_object_or_404(Group, slug=slug)
+    return post_list_response(request, group.posts.for_feed())
+
+
+@api_view
+def profile(request, username):
+    """Посты автора."""
+    author = get_object_or_404(User, username=username)
+    return post_list_response(request, author.posts.for_feed())
+
+
+@api_view
+def follow_index(request):
+    """Посты авторов, на которых подписан пользователь."""
+    if not request.user.is_authenticated:
+        raise ApiError('Нужна авторизация', status=401)
+    return post_list_response(request, user_timeline(request.user),
+                              tiebreak='post_id', load=entry_posts)
+
+
+@api_view
+def post_view(request, post_id):
+    """Пост и страница комментариев к нему по курсору."""
+    fields = requested_fields(request)
+    post = get_object_or_404(Post.objects.for_feed(), pk=post_id)
+    if 'thumbnail' in fields:
+        attach_thumbnails([post])
+    paginator = CursorPaginator(
+        post.comments.for_post(),
+        requested_limit(request, COUNT_PAGE_COMMENTS), field='created')
+    page = paginator.get_page(after=request.GET.get('after'),
+                              before=request.GET.get('before'))
+    head = {'post': serialize(post, fields, POST_FIELDS)}
+    return StreamingHttpResponse(
+        stream_page(page, COMMENT_FIELDS, COMMENT_FIELDS, head),
+        content_type='application/json')
+
+
+@api_view(methods=('POST',))
+def follow_import(request):
+    """
+    Подписывает пользователя сразу на список авторов.
+
+    Принимает JSON {"authors": ["username", ...]} для переноса подписок
+    из другой сети, вставляет их пачками и сообщает, сколько подписок
+    добавилось и какие имена не нашлись.
+    """
+    if not request.user.is_authenticated:
+        raise ApiError('Нужна авторизация', status=401)
+    try:
+        authors = json.loads(request.body)['authors']
+    except (ValueError, KeyError, TypeError):
+        raise ApiError('Ожидается JSON вида {"authors": [...]}')
+    if (not isinstance(authors, list)
+            or not all(isinstance(name, str) for name in authors)):
+        raise ApiError('authors должен быть списком имён')
+    if len(authors) > MAX_IMPORT:
+        raise ApiError(f'Не больше {MAX_IMPORT} авторов за раз')
+    ids = user_ids(authors)
+    created = import_follows(
+        (request.user.pk, ids[name]) for name in authors if name in ids)
+    return JsonResponse({
+        'created': created,
+        'unknown': sorted(set(authors) - set(ids)),
+    })
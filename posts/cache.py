@@ -0,0 +1,130 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import (get_conditional_response,
+                                patch_vary_headers, quote_etag)
+from django.utils.http import http_date
+
+FEED_VERSION_KEY = 'posts:feed_version'
+EPOCH_KEY = 'posts:epoch'
+SCOPE_VERSION_KEY = 'posts:version:{scope}'
+PAGE_KEY = 'posts:page:{version}:{path}'
+
+
+def feed_version():
+    """
+    Текущая версия ленты.
+
+    Версия входит в ключи кэша ленты: пока её не сменили, кэш валиден.
+    Если ключ вытеснили из кэша, новая версия берётся из времени, чтобы
+    не совпасть ни с одной из уже выданных.
+    """
+    return cache.get_or_set(FEED_VERSION_KEY, time.time_ns, None)
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def bump_feed_version():
+    """Сбрасывает весь кэш ленты, меняя её версию."""
+    _bump(FEED_VERSION_KEY)
+
+
+def scope_version(*scopes):
+    """
+    Версия отдельных лент: index, group:<id>, author:<id>, follow:<id>.
+
+    В отличие от feed_version, её меняют только посты и подписки самих
+    этих лент (см. posts.signals), а не любая запись на сайте. Версия
+    нескольких лент меняется вместе с любой из них.
+    """
+    keys = [EPOCH_KEY] + [SCOPE_VERSION_KEY.format(scope=scope)
+                          for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return '-'.join(str(versions[key]) for key in keys)
+
+
+def bump_scope_versions(*scopes):
+    for scope in scopes:
+        _bump(SCOPE_VERSION_KEY.format(scope=scope))
+
+
+def reset_feed_versions():
+    """
+    Сбрасывает кэш всех лент после массовой записи мимо сигналов.
+
+    Нужно после bulk_create, пересборки денормализации и копирования
+    реплик: какие именно ленты изменились, неизвестно.
+    """
+    bump_feed_version()
+    _bump(EPOCH_KEY)
+
+
+def page_cache_key(request):
+    """Ключ страницы: версия ленты, путь и строка запроса."""
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return PAGE_KEY.format(version=feed_version(), path=path)
+
+
+def anonymous_page_cache(last_modified):
+    """
+    Кэширует страницу целиком для неавторизованных читателей.
+
+    Все гости видят один и тот же HTML, поэтому готовая страница
+    хранится в кэше вместе со строгим ETag и Last-Modified, который
+    считает last_modified(request, *args, **kwargs) по самой свежей
+    дате на странице. Повторный визит с If-None-Match или
+    If-Modified-Since получает 304 без рендера шаблонов. Кэш сбрасывается
+    сменой версии ленты при записи постов и комментариев.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            key = page_cache_key(request)
+            entry = cache.get(key)
+            response = None
+            if entry is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming:
+                    return response
+                modified = last_modified(request, *args, **kwargs)
+                entry = {
+                    'content': response.content,
+                    'content_type': response['Content-Type'],
+                    'etag': quote_etag(
+                        hashlib.md5(response.content).hexdigest()),
+                    'last_modified': (int(modified.timestamp())
+                                      if modified else None),
+                }
+                cache.set(key, entry, settings.FEED_CACHE_TIMEOUT)
+
+            conditional = get_conditional_response(
+                request, etag=entry['etag'],
+                last_modified=entry['last_modified'])
+            if conditional is not None:
+                response = conditional
+            elif response is None:
+                response = HttpResponse(entry['content'],
+                                        content_type=entry['content_type'])
+            response['ETag'] = entry['etag']
+            if entry['last_modified']:
+                response['Last-Modified'] = http_date(entry['last_modified'])
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
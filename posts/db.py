@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.db import connection
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    Настраивает каждое новое соединение SQLite прагмами SQLITE_PRAGMAS.
+
+    Подключается к сигналу connection_created. Прагмы вроде cache_size
+    и busy_timeout действуют только на своё соединение, поэтому их нельзя
+    выставить один раз на файл базы, как journal_mode.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def analyze():
+    """
+    Обновляет статистику планировщика: sqlite_stat1 или pg_class.
+
+    По ней estimated_rows оценивает размер таблицы, не считая COUNT(*).
+    Запускается после массовой загрузки. Возвращает, была ли она собрана.
+    """
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return True
@@ -0,0 +1,131 @@
+import logging
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import models, transaction
+
+from .tasks import run_in_background
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+PROGRESS_KEY = 'posts:deletion:{label}:{pk}'
+PROGRESS_TIMEOUT = 60 * 60 * 24
+
+
+def _relations(model):
+    """Обратные связи, которые при удалении каскадятся или обнуляются."""
+    for relation in model._meta.related_objects:
+        if relation.many_to_many:
+            continue
+        if relation.on_delete in (models.CASCADE, models.SET_NULL):
+            yield relation
+
+
+def _delete_batches(queryset, progress, batch_size):
+    """
+    Удаляет выборку пачками по batch_size, начиная с зависимых записей.
+
+    Каскадные зависимости пачки удаляются тем же способом, ссылки
+    SET_NULL обнуляются такими же пачками. Сама пачка удаляется обычным
+    delete() в своей транзакции, так что сигналы срабатывают, но
+    Collector уже не находит, что тащить в память, а база не
+    блокируется надолго.
+    """
+    model = queryset.model
+    manager = model._base_manager
+    while True:
+        ids = list(queryset.order_by().values_list('pk', flat=True)
+                   [:batch_size])
+        if not ids:
+            return
+        for relation in _relations(model):
+            related = relation.related_model._base_manager.filter(
+                **{f'{relation.field.name}__in': ids})
+            if relation.on_delete is models.SET_NULL:
+                _detach_batches(related, relation.field.name, batch_size)
+            else:
+                _delete_batches(related, progress, batch_size)
+        with transaction.atomic():
+            manager.filter(pk__in=ids).delete()
+        progress(model, len(ids))
+
+
+def _detach_batches(queryset, field, batch_size):
+    """Обнуляет ссылку field у выборки пачками по batch_size."""
+    manager = queryset.model._base_manager
+    while True:
+        ids = list(queryset.order_by().values_list('pk', flat=True)
+                   [:batch_size])
+        if not ids:
+            return
+        manager.filter(pk__in=ids).update(**{field: None})
+
+
+def progress_key(model, pk):
+    return PROGRESS_KEY.format(label=model._meta.label_lower, pk=pk)
+
+
+def get_progress(model, pk):
+    """Ход удаления объекта: статус и число удалённых строк по моделям."""
+    return cache.get(progress_key(model, pk))
+
+
+def delete_object(label, pk, batch_size=BATCH_SIZE, report=None):
+    """
+    Удаляет объект модели label со всеми зависимыми записями по пачкам.
+
+    Ход удаления пишется в кэш (см. get_progress) и в лог после каждой
+    пачки, а если передан report — ещё и отдаётся ему словарём
+    {модель: удалено строк}. Возвращает тот же словарь.
+    """
+    model = apps.get_model(label)
+    key = progress_key(model, pk)
+    state = {'status': 'running', 'deleted': {}}
+    cache.set(key, state, PROGRESS_TIMEOUT)
+
+    def progress(deleted_model, count):
+        name = deleted_model._meta.label
+        state['deleted'][name] = state['deleted'].get(name, 0) + count
+        cache.set(key, state, PROGRESS_TIMEOUT)
+        logger.info('Удаление %s #%s: %s', label, pk, state['deleted'])
+        if report:
+            report(state['deleted'])
+
+    _delete_batches(model._base_manager.filter(pk=pk), progress,
+                    batch_size)
+    state['status'] = 'done'
+    cache.set(key, state, PROGRESS_TIMEOUT)
+    return state['deleted']
+
+
+def delete_in_background(obj):
+    """Ставит удаление объекта в фоновую очередь после коммита."""
+    cache.set(progress_key(type(obj), obj.pk),
+              {'status': 'queued', 'deleted': {}}, PROGRESS_TIMEOUT)
+    run_in_background(delete_object, obj._meta.label, obj.pk)
+
+
+def deletion_summary(objs):
+    """
+    Сводка для страницы подтверждения удаления без обхода каскада.
+
+    Вместо полного дерева, которое админка собирает Collector'ом,
+    считает только прямые зависимые записи — по COUNT на связь.
+    Возвращает словарь {модель: число записей}.
+    """
+    objs = list(objs)
+    if not objs:
+        return {}
+    model = type(objs[0])
+    ids = [obj.pk for obj in objs]
+    counts = {model: len(objs)}
+    for relation in _relations(model):
+        if relation.on_delete is not models.CASCADE:
+            continue
+        related = relation.related_model
+        count = related._base_manager.filter(
+            **{f'{relation.field.name}__in': ids}).count()
+        if count:
+            counts[related] = counts.get(related, 0) + count
+    return counts
@@ -0,0 +1,149 @@
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.views.decorators.http import condition
+
+from .cache import scope_version
+from .models import Group, Post
+
+User = get_user_model()
+FEED_ITEMS = 20
+
+
+class PostsFeed(Feed):
+    """
+    Atom-лента последних постов сайта.
+
+    Дата updated у ленты и записей берётся из pub_date постов, которые
+    уже выбраны одним запросом вместе с авторами и группами.
+    """
+    feed_type = Atom1Feed
+    title = 'Yatube: последние записи'
+    subtitle = 'Новые записи всех авторов'
+
+    def link(self):
+        return reverse('index')
+
+    def posts(self, obj):
+        return Post.objects.for_feed()
+
+    def items(self, obj):
+        return self.posts(obj)[:FEED_ITEMS]
+
+    def item_title(self, post):
+        return str(post)
+
+    def item_description(self, post):
+        return post.text
+
+    def item_link(self, post):
+        return reverse('post', args=[post.author.username, post.pk])
+
+    def item_author_name(self, post):
+        return post.author.username
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_updateddate(self, post):
+        return post.pub_date
+
+    def item_categories(self, post):
+        return [post.group.title] if post.group_id else []
+
+
+class GroupFeed(PostsFeed):
+    """Atom-лента постов группы."""
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def subtitle(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('group_page', args=[group.slug])
+
+    def posts(self, group):
+        return group.posts.for_feed()
+
+
+class AuthorFeed(PostsFeed):
+    """Atom-лента постов автора."""
+
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f'Yatube: записи {author.username}'
+
+    def subtitle(self, author):
+        return f'Новые записи автора {author.username}'
+
+    def link(self, author):
+        return reverse('profile', args=[author.username])
+
+    def posts(self, author):
+        return author.posts.for_feed()
+
+
+def newest_post_query(lookups, scope=None):
+    """Дата и id группы или автора самого свежего поста ленты."""
+    fields = ['pub_date'] + ([f'{scope}_id'] if scope else [])
+    return Post.objects.filter(**lookups).order_by('-pub_date').values_list(
+        *fields)[:1]
+
+
+def feed_state(lookups, scope=None):
+    """
+    Дата самого свежего поста ленты и версия ленты.
+
+    Дата и id для ключа версии берутся одной выборкой первой строки по
+    индексу (group или author, pub_date), версия — из кэша (см.
+    posts.cache.scope_version).
+    """
+    row = next(iter(newest_post_query(lookups, scope)), None)
+    if row is None:
+        return None, None
+    version = scope_version(f'{scope}:{row[1]}' if scope else 'index')
+    return row[0], version
+
+
+def conditional_feed(feed, scope):
+    """
+    Отвечает на опрос ленты 304, пока в ней не появилось нового.
+
+    scope по аргументам URL отдаёт фильтр постов ленты и тип ленты.
+    Last-Modified — дата самого свежего поста ленты, ETag — она же
+    с версией ленты, которую меняют только посты самой ленты: удаление
+    поста тоже меняет ETag, а активность в других группах и у других
+    авторов опрос не сбрасывает. Результат запоминается на запросе,
+    чтобы ETag и Last-Modified не считали его дважды.
+    """
+    def state(request, *args, **kwargs):
+        if not hasattr(request, 'feed_state'):
+            request.feed_state = feed_state(*scope(*args, **kwargs))
+        return request.feed_state
+
+    def newest(request, *args, **kwargs):
+        return state(request, *args, **kwargs)[0]
+
+    def etag(request, *args, **kwargs):
+        newest, version = state(request, *args, **kwargs)
+        stamp = int(newest.timestamp() * 1000000) if newest else 0
+        return f'{version}-{stamp}'
+
+    return condition(etag_func=etag, last_modified_func=newest)(feed)
+
+
+posts_feed = conditional_feed(PostsFeed(), lambda: ({},))
+group_feed = conditional_feed(
+    GroupFeed(), lambda slug: ({'group__slug': slug}, 'group'))
+author_feed = conditional_feed(
+    AuthorFeed(), lambda username: ({'author__username': username},
+                                    'author'))
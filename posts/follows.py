@@ -0,0 +1,121 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+
+from .cache import reset_feed_versions
+from .models import Follow
+from .stats import bulk_change_stats
+from .timeline import backfill_follows
+
+User = get_user_model()
+BATCH_SIZE = 1000
+
+
+def follow(user_id, author_id):
+    """
+    Подписывает user_id на author_id одним INSERT с игнором конфликта.
+
+    Дубль отсекает уникальный индекс (user, author), поэтому двойной
+    клик или параллельные запросы не создают вторую подписку. Ленту,
+    счётчики и кэш обновляют обычные сигналы, но только если строка
+    действительно вставилась. Возвращает True для новой подписки.
+    """
+    if user_id == author_id:
+        return False
+    table = connection.ops.quote_name(Follow._meta.db_table)
+    sql = (f'{connection.ops.insert_statement(ignore_conflicts=True)} '
+           f'{table} (user_id, author_id) VALUES (%s, %s) '
+           f'{connection.ops.ignore_conflicts_suffix_sql(True)}')
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [user_id, author_id])
+            created = cursor.rowcount == 1
+        if created:
+            post_save.send(sender=Follow,
+                           instance=Follow(user_id=user_id,
+                                           author_id=author_id),
+                           created=True, update_fields=None, raw=False,
+                           using=connection.alias)
+    return created
+
+
+def unfollow(user_id, author_id):
+    """
+    Отписывает user_id от author_id одним DELETE.
+
+    Повторная отписка ничего не меняет. Возвращает True, если подписка
+    была и удалилась.
+    """
+    table = connection.ops.quote_name(Follow._meta.db_table)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE user_id = %s AND author_id = %s',
+                [user_id, author_id])
+            deleted = cursor.rowcount == 1
+        if deleted:
+            post_delete.send(sender=Follow,
+                             instance=Follow(user_id=user_id,
+                                             author_id=author_id),
+                             using=connection.alias)
+    return deleted
+
+
+def import_follows(pairs, batch_size=BATCH_SIZE):
+    """
+    Загружает пачку подписок (user_id, author_id) для переезда аудитории.
+
+    Подписки вставляются bulk_create'ом с игнором конфликтов пачками
+    по batch_size. Ленты новых подписчиков дозаполняются одной выборкой
+    постов на пачку, счётчики сдвигаются UPDATE'ом на всю пачку,
+    кэш ленты сбрасывается один раз в конце. Самоподписки и повторы
+    пропускаются. Если параллельно кто-то подписался на того же автора,
+    счётчики могут разойтись на единицу — их чинит repair_stats.
+    Возвращает число новых подписок.
+    """
+    created = 0
+    batch = set()
+    for user_id, author_id in pairs:
+        if user_id != author_id:
+            batch.add((user_id, author_id))
+        if len(batch) >= batch_size:
+            created += _import_batch(batch)
+            batch = set()
+    if batch:
+        created += _import_batch(batch)
+    if created:
+        reset_feed_versions()
+    return created
+
+
+def _import_batch(pairs):
+    with transaction.atomic():
+        existing = set(Follow.objects.filter(
+            user_id__in={user_id for user_id, _ in pairs},
+            author_id__in={author_id for _, author_id in pairs},
+        ).values_list('user_id', 'author_id'))
+        new = pairs - existing
+        Follow.objects.bulk_create(
+            (Follow(user_id=user_id, author_id=author_id)
+             for user_id, author_id in new),
+            ignore_conflicts=True,
+        )
+        backfill_follows(new)
+        bulk_change_stats('follower_count',
+                          Counter(author_id for _, author_id in new))
+        bulk_change_stats('following_count',
+                          Counter(user_id for user_id, _ in new))
+    return len(new)
+
+
+def user_ids(usernames):
+    """Словарь username -> id, по одному запросу на BATCH_SIZE имён."""
+    usernames = list(set(usernames))
+    ids = {}
+    for start in range(0, len(usernames), BATCH_SIZE):
+        ids.update(User.objects.filter(
+            username__in=usernames[start:start + BATCH_SIZE]
+        ).values_list('username', 'pk'))
+    return ids
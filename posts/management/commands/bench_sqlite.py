@@ -0,0 +1,144 @@
+import os
+import sqlite3
+import tempfile
+import time
+from multiprocessing import Pool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+    'author_id INTEGER NOT NULL, text TEXT NOT NULL, pub_date REAL NOT NULL)',
+    'CREATE INDEX post_pub_date ON post (pub_date)',
+    'CREATE TABLE stats (author_id INTEGER PRIMARY KEY, '
+    'post_count INTEGER NOT NULL)',
+)
+AUTHORS = 100
+
+
+def connect(path, pragmas):
+    db = sqlite3.connect(path, timeout=5, isolation_level=None)
+    for name, value in pragmas.items():
+        db.execute(f'PRAGMA {name} = {value}')
+    return db
+
+
+def read(db, num):
+    """Как главная страница: десять свежих постов."""
+    db.execute('SELECT id, author_id, text FROM post '
+               'ORDER BY pub_date DESC LIMIT 10').fetchall()
+
+
+def write(db, num):
+    """Как new_post: пост и счётчик автора в одной транзакции."""
+    author_id = num % AUTHORS
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        db.execute('INSERT INTO post (author_id, text, pub_date) '
+                   'VALUES (?, ?, ?)', (author_id, 'пост', time.time()))
+        db.execute('UPDATE stats SET post_count = post_count + 1 '
+                   'WHERE author_id = ?', (author_id,))
+        db.execute('COMMIT')
+    except sqlite3.Error:
+        db.execute('ROLLBACK')
+        raise
+
+
+OPERATIONS = {'read': read, 'write': write}
+
+
+def worker(path, pragmas, persistent, operation, seconds):
+    """
+    Гоняет операцию seconds секунд, как один воркер gunicorn.
+
+    Без persistent соединение открывается на каждую операцию, как при
+    CONN_MAX_AGE = 0. Возвращает (успешных операций, ошибок блокировки).
+    """
+    done = locked = 0
+    run = OPERATIONS[operation]
+    db = connect(path, pragmas) if persistent else None
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        conn = db or connect(path, pragmas)
+        try:
+            run(conn, done)
+            done += 1
+        except sqlite3.OperationalError:
+            locked += 1
+        finally:
+            if not persistent:
+                conn.close()
+    if db:
+        db.close()
+    return done, locked
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite при параллельных чтениях '
+        'и записях: настройки по умолчанию и соединение на запрос против '
+        'SQLITE_PRAGMAS и постоянных соединений. Запускать с боевыми '
+        'настройками: --settings=yatube.settings_production.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--rows', type=int, default=10000,
+                            help='Постов в базе перед замером.')
+
+    def handle(self, *args, **options):
+        pragmas = settings.SQLITE_PRAGMAS
+        if not pragmas:
+            raise CommandError(
+                'SQLITE_PRAGMAS пуст, сравнивать не с чем: запустите с '
+                '--settings=yatube.settings_production')
+        profiles = (
+            ('по умолчанию', {}, False),
+            ('SQLITE_PRAGMAS', pragmas, True),
+        )
+        results = []
+        for name, profile_pragmas, persistent in profiles:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                self.create_database(path, options['rows'])
+                results.append(self.measure(
+                    path, profile_pragmas, persistent, options))
+            reads, writes, locked = results[-1]
+            self.stdout.write(
+                f'{name}: чтений {reads:.0f}/с, записей {writes:.0f}/с, '
+                f'ошибок блокировки {locked}')
+        (base_reads, base_writes, _), (reads, writes, _) = results
+        self.stdout.write(self.style.SUCCESS(
+            f'Ускорение: чтения ×{reads / max(base_reads, 1):.1f}, '
+            f'записи ×{writes / max(base_writes, 1):.1f}'))
+
+    def create_database(self, path, rows):
+        db = sqlite3.connect(path)
+        for statement in SCHEMA:
+            db.execute(statement)
+        now = time.time()
+        db.executemany(
+            'INSERT INTO post (author_id, text, pub_date) VALUES (?, ?, ?)',
+            ((num % AUTHORS, 'пост', now - num) for num in range(rows)))
+        db.executemany('INSERT INTO stats VALUES (?, 0)',
+                       ((num,) for num in range(AUTHORS)))
+        db.commit()
+        db.close()
+
+    def measure(self, path, pragmas, persistent, options):
+        """Запускает читателей и писателей параллельно, отдаёт ops/s."""
+        seconds = options['seconds']
+        tasks = ([(path, pragmas, persistent, 'read', seconds)]
+                 * options['readers']
+                 + [(path, pragmas, persistent, 'write', seconds)]
+                 * options['writers'])
+        with Pool(len(tasks)) as pool:
+            counts = pool.starmap(worker, tasks)
+        readers = counts[:options['readers']]
+        writers = counts[options['readers']:]
+        return (sum(done for done, _ in readers) / seconds,
+                sum(done for done, _ in writers) / seconds,
+                sum(locked for _, locked in counts))
@@ -0,0 +1,83 @@
+import gzip
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from posts.export import EXPORTS, FORMATS, export_lines, export_queryset
+
+
+def parse_date(value):
+    date = parse_datetime(value)
+    if date is None:
+        raise CommandError(f'Не дата: {value}')
+    return date
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты, комментарии или подписки в NDJSON или CSV '
+        'потоком, в постоянной памяти при любом размере таблицы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=sorted(FORMATS),
+                            default='ndjson')
+        parser.add_argument('--output', '-o', default='-',
+                            help='Файл выгрузки, «-» — stdout.')
+        parser.add_argument('--gzip', action='store_true',
+                            help='Сжимать выгрузку gzip.')
+        parser.add_argument('--since', type=parse_date,
+                            help='Только записи новее этой даты (ISO 8601).')
+        parser.add_argument('--until', type=parse_date,
+                            help='Только записи не новее этой даты.')
+
+    def handle(self, *args, **options):
+        kind = options['kind']
+        since, until = options['since'], options['until']
+        date_field = EXPORTS[kind][2]
+        try:
+            queryset = export_queryset(kind, since, until)
+        except ValueError as error:
+            raise CommandError(error)
+        if date_field and until is None:
+            # Верхняя граница фиксируется заранее: записи, появившиеся
+            # во время выгрузки, достанутся следующему запуску
+            until = queryset.aggregate(last=Max(date_field))['last']
+            queryset = export_queryset(kind, since, until)
+
+        if options['output'] == '-':
+            raw = sys.stdout.buffer
+        else:
+            raw = open(options['output'], 'wb')
+        stream = raw
+        if options['gzip']:
+            stream = gzip.GzipFile(fileobj=raw, mode='wb')
+
+        started = time.perf_counter()
+        total = 0
+        try:
+            for line in export_lines(kind, options['format'], queryset):
+                stream.write(line.encode())
+                total += 1
+        finally:
+            if stream is not raw:
+                stream.close()
+            if raw is not sys.stdout.buffer:
+                raw.close()
+            else:
+                raw.flush()
+
+        if options['format'] == 'csv':
+            total -= 1
+        elapsed = time.perf_counter() - started
+        rate = total / elapsed if elapsed else total
+        # Сводка идёт в stderr, чтобы не смешиваться с выгрузкой в stdout
+        self.stderr.write(f'{kind}: {total} строк за {elapsed:.1f} с '
+                          f'({rate:.0f} строк/с)')
+        if until is not None:
+            self.stderr.write(f'для следующей выгрузки: '
+                              f'--since {until.isoformat()}')
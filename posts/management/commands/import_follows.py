@@ -0,0 +1,38 @@
+import csv
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.follows import BATCH_SIZE, import_follows, user_ids
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает подписки из CSV с парами «подписчик,автор» (имена '
+        'пользователей). Путь «-» читает файл из stdin.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['path'] == '-':
+            rows = list(csv.reader(sys.stdin))
+        else:
+            with open(options['path'], newline='') as file:
+                rows = list(csv.reader(file))
+        rows = [row for row in rows if len(row) >= 2]
+        ids = user_ids(name for row in rows for name in row[:2])
+        pairs = [(ids[user], ids[author]) for user, author, *_ in rows
+                 if user in ids and author in ids]
+        created = import_follows(pairs, batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        rate = len(rows) / elapsed if elapsed else len(rows)
+        self.stdout.write(
+            f'строк: {len(rows)}, неизвестных пар: {len(rows) - len(pairs)}, '
+            f'за {elapsed:.1f} с ({rate:.0f} строк/с)')
+        self.stdout.write(self.style.SUCCESS(
+            f'Подписки загружены, новых: {created}'))
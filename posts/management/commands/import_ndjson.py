@@ -0,0 +1,229 @@
+import json
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import search, stats, timeline
+from posts.cache import reset_feed_versions
+from posts.models import Comment, Group, Post
+from posts.rebuild import inserted_ids, rebuild_derived_data
+
+User = get_user_model()
+
+
+@contextmanager
+def keep_dates(*fields):
+    """
+    Отключает auto_now_add у полей на время импорта.
+
+    Иначе bulk_create перезапишет исходные даты постов и комментариев
+    временем загрузки. Команда работает в своём процессе, поэтому
+    временная правка поля никого больше не задевает.
+    """
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def parse_date(value):
+    date = parse_datetime(value) if value else None
+    if date is None:
+        return timezone.now()
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты и комментарии из NDJSON. Строка поста: '
+        '{"type": "post", "ref": "внешний id", "author": "username", '
+        '"group": "slug", "text": "...", "pub_date": "ISO 8601", '
+        '"image": "posts/x.jpg"}. Строка комментария: {"type": "comment", '
+        '"post_ref": "ref поста из этого файла" или "post_id": id, '
+        '"author": "username", "text": "...", "created": "ISO 8601"}. '
+        'Посты должны идти раньше своих комментариев.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл NDJSON, «-» — stdin.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--create-missing', action='store_true',
+                            help='Создавать неизвестных авторов и группы, '
+                                 'иначе такие строки пропускаются.')
+        parser.add_argument('--defer-rebuild', action='store_true',
+                            help='Не обновлять ленты, счётчики и индекс '
+                                 'по пачкам, а пересобрать их один раз '
+                                 'в конце.')
+
+    def handle(self, *args, **options):
+        self.create_missing = options['create_missing']
+        self.defer = options['defer_rebuild']
+        self.users = {}
+        self.groups = {}
+        self.refs = {}
+        self.counts = Counter()
+        batch_size = options['batch_size']
+        started = time.perf_counter()
+
+        posts, comments = [], []
+        with keep_dates(Post._meta.get_field('pub_date'),
+                        Comment._meta.get_field('created')):
+            for row in self.read(options['path']):
+                if row.get('type') == 'post':
+                    posts.append(row)
+                elif row.get('type') == 'comment':
+                    comments.append(row)
+                else:
+                    self.counts['broken'] += 1
+                if len(posts) + len(comments) >= batch_size:
+                    self.flush(posts, comments)
+                    posts, comments = [], []
+                    self.progress(started)
+            self.flush(posts, comments)
+
+        if self.defer:
+            summary = rebuild_derived_data()
+            self.stdout.write(f'денормализация: {summary}')
+        else:
+            reset_feed_versions()
+        self.progress(started)
+        self.stdout.write(self.style.SUCCESS(
+            'Импорт завершён: ' + ', '.join(
+                f'{key}: {value}'
+                for key, value in sorted(self.counts.items()))))
+
+    def read(self, path):
+        file = sys.stdin if path == '-' else open(path, encoding='utf-8')
+        try:
+            for num, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                if not isinstance(row, dict):
+                    self.stderr.write(f'строка {num}: не объект JSON')
+                    self.counts['broken'] += 1
+                    continue
+                yield row
+        finally:
+            if file is not sys.stdin:
+                file.close()
+
+    def progress(self, started):
+        elapsed = time.perf_counter() - started
+        total = self.counts['posts'] + self.counts['comments']
+        rate = total / elapsed if elapsed else total
+        self.stdout.write(f'загружено {total} строк за {elapsed:.1f} с '
+                          f'({rate:.0f} строк/с)')
+
+    def resolve(self, cache, model, field, names, defaults):
+        """
+        Дополняет кэш name -> id для модели одной выборкой на пачку.
+
+        С --create-missing недостающие записи создаются bulk_create'ом.
+        """
+        missing = {name for name in names if name} - set(cache)
+        if not missing:
+            return
+        lookup = {f'{field}__in': missing}
+        cache.update(model.objects.filter(**lookup).values_list(field, 'pk'))
+        missing -= set(cache)
+        if missing and self.create_missing:
+            model.objects.bulk_create(
+                model(**{field: name}, **defaults(name)) for name in missing)
+            cache.update(
+                model.objects.filter(**lookup).values_list(field, 'pk'))
+            self.counts[f'created_{model._meta.model_name}s'] += len(missing)
+
+    def flush(self, posts, comments):
+        if not posts and not comments:
+            return
+        password = make_password(None)
+        with transaction.atomic():
+            self.resolve(self.users, User, 'username',
+                         {row.get('author') for row in posts + comments},
+                         lambda name: {'password': password})
+            self.resolve(self.groups, Group, 'slug',
+                         {row.get('group') for row in posts},
+                         lambda slug: {'title': slug, 'description': ''})
+            post_ids = self.insert_posts(posts)
+            comment_posts = self.insert_comments(comments)
+            if not self.defer:
+                self.update_derived(post_ids, comment_posts)
+
+    def insert_posts(self, posts):
+        objects, refs = [], []
+        for row in posts:
+            author_id = self.users.get(row.get('author'))
+            if author_id is None or not row.get('text'):
+                self.counts['skipped_posts'] += 1
+                continue
+            objects.append(Post(
+                text=row['text'], author_id=author_id,
+                group_id=self.groups.get(row.get('group')),
+                pub_date=parse_date(row.get('pub_date')),
+                image=row.get('image') or '',
+            ))
+            refs.append(row.get('ref'))
+        if not objects:
+            return []
+        post_ids = inserted_ids(Post, objects)
+        for ref, post_id, post in zip(refs, post_ids, objects):
+            post.pk = post_id
+            if ref is not None:
+                self.refs[ref] = post_id
+        self.counts['posts'] += len(objects)
+        self.new_posts = objects
+        return post_ids
+
+    def insert_comments(self, comments):
+        """
+        Вставляет комментарии пачки.
+
+        Посты из post_id проверяются одной выборкой на пачку: комментарий
+        к несуществующему посту пропускается, а не роняет всю пачку
+        ошибкой внешнего ключа.
+        """
+        post_ids = {self.refs.get(row.get('post_ref'), row.get('post_id'))
+                    for row in comments}
+        existing = set(Post.objects.filter(
+            pk__in=post_ids - {None}).values_list('pk', flat=True))
+        objects = []
+        for row in comments:
+            author_id = self.users.get(row.get('author'))
+            post_id = self.refs.get(row.get('post_ref'), row.get('post_id'))
+            if (author_id is None or post_id not in existing
+                    or not row.get('text')):
+                self.counts['skipped_comments'] += 1
+                continue
+            objects.append(Comment(
+                text=row['text'], author_id=author_id, post_id=post_id,
+                created=parse_date(row.get('created')),
+            ))
+        Comment.objects.bulk_create(objects)
+        self.counts['comments'] += len(objects)
+        return Counter(comment.post_id for comment in objects)
+
+    def update_derived(self, post_ids, comment_posts):
+        """Ленты, счётчики и индекс для пачки — по запросу на шаг."""
+        if post_ids:
+            timeline.fan_out_posts(post_ids)
+            search.index_posts(post_ids)
+            stats.bulk_change_stats('post_count', Counter(
+                post.author_id for post in self.new_posts))
+        stats.add_comment_counts(comment_posts)
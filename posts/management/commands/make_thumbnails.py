@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Нарезает миниатюры для всех постов с картинками.'
+
+    def handle(self, *args, **options):
+        post_ids = Post.objects.exclude(image='').exclude(
+            image__isnull=True).values_list('pk', flat=True)
+        total = 0
+        for post_id in post_ids.iterator():
+            generate_thumbnails(post_id)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюры нарезаны для постов: {total}'))
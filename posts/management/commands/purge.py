@@ -0,0 +1,32 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import deletion
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет объект вместе с зависимыми записями пачками, '
+        'печатая ход удаления. Пример: purge auth.User 42'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help='Модель в виде app_label.Model.')
+        parser.add_argument('pk', type=int)
+        parser.add_argument('--batch-size', type=int,
+                            default=deletion.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options['model'])
+        except (LookupError, ValueError) as error:
+            raise CommandError(error)
+        if not model._base_manager.filter(pk=options['pk']).exists():
+            raise CommandError(f'{model._meta.label} #{options["pk"]} '
+                               f'не найден')
+        deletion.delete_object(
+            model._meta.label, options['pk'],
+            batch_size=options['batch_size'],
+            report=lambda deleted: self.stdout.write(', '.join(
+                f'{label}: {count}' for label, count in deleted.items())))
+        self.stdout.write(self.style.SUCCESS('Удаление завершено'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.timeline import rebuild_timelines
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок пользователей по таблице Follow.'
+
+    def handle(self, *args, **options):
+        total = rebuild_timelines()
+        self.stdout.write(self.style.SUCCESS(
+            f'Ленты подписок пересобраны, записей: {total}'))
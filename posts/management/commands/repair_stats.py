@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.stats import recount_stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики профилей и чинит расхождения.'
+
+    def handle(self, *args, **options):
+        fixed = recount_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики пересчитаны, исправлено профилей: {fixed}'))
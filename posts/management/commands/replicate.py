@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.replicas import replica_aliases, replicate
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в реплики из DATABASE_REPLICAS. '
+            'С --interval повторяет копию каждые N секунд.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Период копирования в секундах, 0 — '
+                                 'скопировать один раз.')
+
+    def handle(self, *args, **options):
+        if not replica_aliases():
+            raise CommandError('Реплики не настроены: задайте '
+                               'YATUBE_REPLICAS или DATABASE_REPLICAS.')
+        while True:
+            started = time.perf_counter()
+            copied = replicate()
+            self.stdout.write(
+                f'Реплики {", ".join(copied) or "-"} обновлены за '
+                f'{time.perf_counter() - started:.2f} с')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,213 @@
+import os
+import random
+import time
+from io import BytesIO
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+
+from posts.db import analyze
+from posts.models import Comment, Follow, Group, Post
+from posts.rebuild import inserted_ids, rebuild_derived_data
+
+User = get_user_model()
+
+WORDS = (
+    'мороз солнце день чудесный друг прелестный пора красавица проснись '
+    'вечор вьюга злилась небо мгла носилась луна туча бледное пятно '
+    'желтела печальная сидела нынче взгляни окно голубыми небесами '
+    'великолепными коврами блестя снег лежит прозрачный лес чернеет '
+    'ель сквозь иней зеленеет речка подо льдом блестит'
+).split()
+IMAGE_VARIANTS = 8
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками для нагрузочных замеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts-per-user', type=int, default=10,
+                            help='Среднее число постов на пользователя.')
+        parser.add_argument('--follows', type=int, default=20,
+                            help='Среднее число подписок на пользователя.')
+        parser.add_argument('--follow-skew', type=float, default=1.0,
+                            help='Показатель Ципфа для популярности '
+                                 'авторов, 0 — равномерно.')
+        parser.add_argument('--comments', type=float, default=2.0,
+                            help='Среднее число комментариев на пост.')
+        parser.add_argument('--images', type=float, default=0.1,
+                            help='Доля постов с картинкой, от 0 до 1.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Зерно генератора для повторяемости.')
+        parser.add_argument('--prefix', default='seed',
+                            help='Префикс имён пользователей и групп.')
+        parser.add_argument('--no-rebuild', action='store_true',
+                            help='Не пересобирать ленты, счётчики и '
+                                 'поисковый индекс после загрузки.')
+
+    def handle(self, *args, **options):
+        if not 0 <= options['images'] <= 1:
+            raise CommandError('--images должен быть от 0 до 1')
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.tag = f"{options['prefix']}{int(time.time())}"
+
+        user_ids = self.timed('пользователи', self.create_users,
+                              options['users'])
+        group_ids = self.timed('группы', self.create_groups,
+                               options['groups'])
+        images = self.make_images() if options['images'] else []
+        post_ids = self.timed('посты', self.create_posts, user_ids,
+                              group_ids, options['posts_per_user'],
+                              images, options['images'])
+        self.timed('подписки', self.create_follows, user_ids,
+                   options['follows'], options['follow_skew'])
+        self.timed('комментарии', self.create_comments, post_ids,
+                   user_ids, options['comments'])
+
+        if not options['no_rebuild']:
+            started = time.perf_counter()
+            summary = rebuild_derived_data()
+            self.stdout.write(
+                f'денормализация: {summary} '
+                f'за {time.perf_counter() - started:.1f} с')
+        else:
+            # Без статистики планировщика число постов главной не
+            # оценить, и пагинация считала бы COUNT(*) по всей таблице
+            analyze()
+        self.stdout.write(self.style.SUCCESS('База наполнена'))
+
+    def timed(self, title, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - started
+        total = result if isinstance(result, int) else len(result)
+        rate = total / elapsed if elapsed else total
+        self.stdout.write(
+            f'{title}: {total} за {elapsed:.1f} с ({rate:.0f} строк/с)')
+        return result
+
+    def insert(self, model, objects):
+        """Вставляет объекты пачками по batch_size в одной транзакции."""
+        total = 0
+        batch = []
+        with transaction.atomic():
+            for obj in objects:
+                batch.append(obj)
+                if len(batch) >= self.batch_size:
+                    model.objects.bulk_create(batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                model.objects.bulk_create(batch)
+                total += len(batch)
+        return total
+
+    def inserted_ids(self, model, objects):
+        """Вставляет объекты пачками по batch_size и возвращает их id."""
+        with transaction.atomic():
+            return inserted_ids(model, objects, self.batch_size)
+
+    def text(self, words):
+        return ' '.join(self.random.choices(WORDS, k=words)).capitalize()
+
+    def create_users(self, count):
+        password = make_password(None)
+        return self.inserted_ids(User, (
+            User(username=f'{self.tag}_{num}', password=password)
+            for num in range(count)
+        ))
+
+    def create_groups(self, count):
+        return self.inserted_ids(Group, (
+            Group(title=f'Группа {self.tag} {num}',
+                  slug=f'{self.tag}-{num}',
+                  description=self.text(12))
+            for num in range(count)
+        ))
+
+    def make_images(self):
+        """Сохраняет несколько картинок, на которые ссылаются посты."""
+        folder = os.path.join(settings.MEDIA_ROOT, 'posts')
+        os.makedirs(folder, exist_ok=True)
+        names = []
+        for num in range(IMAGE_VARIANTS):
+            name = f'posts/{self.tag}_{num}.png'
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            buffer = BytesIO()
+            Image.new('RGB', (1200, 800), color).save(buffer, 'PNG')
+            with open(os.path.join(settings.MEDIA_ROOT, name), 'wb') as file:
+                file.write(buffer.getvalue())
+            names.append(name)
+        return names
+
+    def create_posts(self, user_ids, group_ids, per_user, images, share):
+        # Авторы перемешаны, чтобы посты одного автора шли вперемешку
+        # с чужими, как в живой ленте
+        authors = [user_id for user_id in user_ids
+                   for _ in range(self.random.randint(0, 2 * per_user))]
+        self.random.shuffle(authors)
+        group_ids = list(group_ids)
+
+        def posts():
+            for author_id in authors:
+                group_id = None
+                if group_ids and self.random.random() < 0.5:
+                    group_id = self.random.choice(group_ids)
+                image = ''
+                if images and self.random.random() < share:
+                    image = self.random.choice(images)
+                yield Post(text=self.text(self.random.randint(5, 60)),
+                           author_id=author_id, group_id=group_id,
+                           image=image)
+
+        return self.inserted_ids(Post, posts())
+
+    def create_follows(self, user_ids, mean, skew):
+        user_ids = list(user_ids)
+        if len(user_ids) < 2 or not mean:
+            return 0
+        # Популярность авторов по закону Ципфа: у немногих авторов
+        # подписчиков очень много, у большинства — единицы
+        weights = accumulate(1 / (rank + 1) ** skew
+                             for rank in range(len(user_ids)))
+        cum_weights = list(weights)
+        authors = user_ids[:]
+        self.random.shuffle(authors)
+
+        def follows():
+            for user_id in user_ids:
+                degree = min(self.random.randint(0, 2 * mean),
+                             len(user_ids) - 1)
+                chosen = set(self.random.choices(
+                    authors, cum_weights=cum_weights, k=degree))
+                chosen.discard(user_id)
+                for author_id in chosen:
+                    yield Follow(user_id=user_id, author_id=author_id)
+
+        return self.insert(Follow, follows())
+
+    def create_comments(self, post_ids, user_ids, mean):
+        user_ids = list(user_ids)
+        if not mean or not user_ids:
+            return 0
+
+        def comments():
+            for post_id in post_ids:
+                for _ in range(self.random.randint(0, int(2 * mean))):
+                    yield Comment(post_id=post_id,
+                                  author_id=self.random.choice(user_ids),
+                                  text=self.text(self.random.randint(3, 20)))
+
+        return self.insert(Comment, comments())
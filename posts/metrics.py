@@ -0,0 +1,164 @@
+import threading
+import time
+from bisect import bisect_left
+
+from django.template.backends.django import DjangoTemplates
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Метрика: (имя, описание, границы корзин)
+METRICS = {
+    'total': ('yatube_request_duration_seconds',
+              'Полное время обработки запроса', DURATION_BUCKETS),
+    'sql': ('yatube_sql_duration_seconds',
+            'Время SQL-запросов за запрос', DURATION_BUCKETS),
+    'template': ('yatube_template_duration_seconds',
+                 'Время рендера шаблонов за запрос', DURATION_BUCKETS),
+    'queries': ('yatube_sql_queries',
+                'Число SQL-запросов за запрос', QUERY_BUCKETS),
+}
+
+_state = threading.local()
+
+
+class Histogram:
+    """Гистограмма в духе Prometheus: корзины, сумма и число замеров."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+
+class Registry:
+    """
+    Гистограммы метрик в разрезе имени вью.
+
+    Живёт в памяти процесса: при нескольких воркерах у каждого своя
+    копия, Prometheus собирает их по отдельности.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._gauges = {}
+
+    def observe(self, view, values):
+        with self._lock:
+            for metric, value in values.items():
+                key = (metric, view)
+                if key not in self._histograms:
+                    self._histograms[key] = Histogram(METRICS[metric][2])
+                self._histograms[key].observe(value)
+
+    def set_gauge(self, name, description, value):
+        """Запоминает разовое значение процесса, например время старта."""
+        with self._lock:
+            self._gauges[name] = (description, value)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._gauges.clear()
+
+    def render(self):
+        """Отдаёт все гистограммы в текстовом формате Prometheus."""
+        lines = []
+        with self._lock:
+            for metric, (name, description, _) in METRICS.items():
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} histogram')
+                for (key, view), histogram in sorted(
+                        self._histograms.items()):
+                    if key != metric:
+                        continue
+                    label = view.replace('\\', '\\\\').replace('"', '\\"')
+                    for bound, total in histogram.cumulative():
+                        lines.append(f'{name}_bucket{{view="{label}",'
+                                     f'le="{bound}"}} {total}')
+                    lines.append(
+                        f'{name}_sum{{view="{label}"}} {histogram.sum}')
+                    lines.append(
+                        f'{name}_count{{view="{label}"}} {histogram.count}')
+            for name, (description, value) in sorted(self._gauges.items()):
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} gauge')
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def start_request():
+    """Заводит счётчики текущего запроса в потоке."""
+    _state.queries = 0
+    _state.sql = 0.0
+    _state.template = 0.0
+    _state.depth = 0
+
+
+def current_request():
+    """Счётчики текущего запроса: число запросов, время SQL и шаблонов."""
+    return {
+        'queries': getattr(_state, 'queries', 0),
+        'sql': getattr(_state, 'sql', 0.0),
+        'template': getattr(_state, 'template', 0.0),
+    }
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    """execute_wrapper, замеряющий каждый SQL-запрос."""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        _state.queries = getattr(_state, 'queries', 0) + 1
+        _state.sql = (getattr(_state, 'sql', 0.0)
+                      + time.perf_counter() - started)
+
+
+class TimedTemplate:
+    """Обёртка шаблона, замеряющая время его рендера."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        # Вложенные рендеры уже входят во время внешнего
+        depth = getattr(_state, 'depth', 0)
+        _state.depth = depth + 1
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            _state.depth = depth
+            if not depth:
+                _state.template = (getattr(_state, 'template', 0.0)
+                                   + time.perf_counter() - started)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Движок шаблонов Django, замеряющий время рендера для метрик."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
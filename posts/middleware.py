@@ -0,0 +1,76 @@
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+from .replicas import PIN_COOKIE, READ_METHODS, replica_aliases
+
+
+class PerformanceMiddleware:
+    """
+    Замеряет каждый запрос: число и время SQL-запросов, время рендера
+    шаблонов и полное время ответа.
+
+    Замеры уходят в заголовок Server-Timing, который видно во вкладке
+    Network браузера, и в гистограммы по имени вью для /metrics.
+    Стоит первым в MIDDLEWARE, чтобы полное время включало остальные
+    middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics.start_request()
+        started = time.perf_counter()
+        wrappers = [connection.execute_wrapper(metrics.sql_wrapper)
+                    for connection in connections.all()]
+        for wrapper in wrappers:
+            wrapper.__enter__()
+        try:
+            response = self.get_response(request)
+        finally:
+            for wrapper in reversed(wrappers):
+                wrapper.__exit__(None, None, None)
+        values = metrics.current_request()
+        values['total'] = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        metrics.registry.observe(view, values)
+        response['Server-Timing'] = server_timing(values)
+        return response
+
+
+def server_timing(values):
+    """Собирает значение заголовка Server-Timing из замеров запроса."""
+    return ', '.join((
+        f'db;dur={values["sql"] * 1000:.1f};'
+        f'desc="{values["queries"]} queries"',
+        f'tpl;dur={values["template"] * 1000:.1f}',
+        f'total;dur={values["total"] * 1000:.1f}',
+    ))
+
+
+class ReplicaPinMiddleware:
+    """
+    Привязывает пользователя к основной базе после записи.
+
+    Успешный запрос, меняющий данные, ставит куку на
+    REPLICA_PIN_SECONDS секунд: этого хватает, чтобы реплики догнали
+    основную базу, а пользователь тем временем видит свои изменения
+    (см. replica_reads). Без реплик кука не ставится.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (request.method not in READ_METHODS
+                and response.status_code < 400 and replica_aliases()):
+            response.set_cookie(PIN_COOKIE, '1',
+                                max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,50 @@
+# Generated by Django 2.2.6 on 2026-10-18 17:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def fill_stats(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+
+    def counts(model, field):
+        return dict(model.objects.values_list(field)
+                    .annotate(total=Count('pk')).order_by())
+
+    post_counts = counts(Post, 'author_id')
+    follower_counts = counts(Follow, 'author_id')
+    following_counts = counts(Follow, 'user_id')
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=user_id,
+                   post_count=post_counts.get(user_id, 0),
+                   follower_count=follower_counts.get(user_id, 0),
+                   following_count=following_counts.get(user_id, 0))
+         for user_id in User.objects.values_list('pk', flat=True)),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0011_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('post_count', models.PositiveIntegerField(default=0)),
+                ('follower_count', models.PositiveIntegerField(default=0)),
+                ('following_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:13
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def drop_duplicate_follows(apps, schema_editor):
+    """
+    Удаляет повторные подписки и пересчитывает счётчики их участников.
+
+    Удаление queryset'ом не вызывает сигналов, а 0012 уже посчитала
+    повторы в UserStats, поэтому счётчики затронутых пользователей
+    считаются заново.
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    keep = Follow.objects.order_by().values('user', 'author').annotate(
+        first=Min('pk')).values_list('first', flat=True)
+    duplicates = Follow.objects.exclude(pk__in=list(keep))
+    users = set()
+    for user_id, author_id in duplicates.values_list('user', 'author'):
+        users.update((user_id, author_id))
+    if not users:
+        return
+    duplicates.delete()
+
+    def counts(field):
+        return dict(Follow.objects.filter(**{f'{field}__in': users})
+                    .values_list(field).annotate(total=Count('pk'))
+                    .order_by())
+
+    followers = counts('author_id')
+    following = counts('user_id')
+    for stats in UserStats.objects.filter(user_id__in=users):
+        stats.follower_count = followers.get(stats.user_id, 0)
+        stats.following_count = following.get(stats.user_id, 0)
+        stats.save(update_fields=['follower_count', 'following_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0014_post_fts'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_follows,
+                             migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='follow',
+            unique_together={('user', 'author')},
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created'], name='posts_comme_post_id_944a68_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['pub_date'], name='posts_post_pub_dat_471922_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'pub_date'], name='posts_post_author__b65dbb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', 'pub_date'], name='posts_post_group_i_5ba9fa_idx'),
+        ),
+    ]
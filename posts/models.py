@@ -13,6 +13,20 @@ class Group(models.Model):
         return str(self.title)
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """
+        Выборка постов для ленты.
+
+        Автор и группа подтягиваются одним JOIN, а из таблиц берутся
+        только поля, которые выводит карточка поста.
+        """
+        return self.select_related('author', 'group').only(
+            'id', 'text', 'pub_date', 'image', 'comment_count', 'author',
+            'group', 'author__username', 'group__title', 'group__slug',
+        )
+
+
 class Post(models.Model):
     text = models.TextField(verbose_name='Текст поста',
                             help_text='Введите текст поста')
@@ -24,12 +38,31 @@ class Post(models.Model):
                               verbose_name='Группа',
                               help_text='Выберите группу для публикации поста')
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return self.text[:15]
 
     class Meta:
         ordering = ('-pub_date',)
+        # Посты читаются только новыми сверху, целиком или по автору
+        # и группе. Индексы по возрастанию: SQLite читает их с конца,
+        # и порядок (pub_date, id) убывает целиком, без сортировки
+        indexes = [
+            models.Index(fields=['pub_date']),
+            models.Index(fields=['author', 'pub_date']),
+            models.Index(fields=['group', 'pub_date']),
+        ]
+
+
+class CommentManager(models.Manager):
+    def for_post(self):
+        """Выборка комментариев для страницы поста вместе с авторами."""
+        return self.get_queryset().select_related('author').only(
+            'id', 'text', 'created', 'post', 'author', 'author__username',
+        )
 
 
 class Comment(models.Model):
@@ -41,11 +74,14 @@ class Comment(models.Model):
                             help_text='Введите текст комментария')
     created = models.DateTimeField(auto_now_add=True)
 
+    objects = CommentManager()
+
     def __str__(self):
         return self.text[:15]
 
     class Meta:
         ordering = ('-created',)
+        indexes = [models.Index(fields=['post', 'created'])]
 
 
 class Follow(models.Model):
@@ -53,3 +89,42 @@ class Follow(models.Model):
                              related_name="follower")
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name="following")
+
+    class Meta:
+        unique_together = ('user', 'author')
+
+
+class FeedEntry(models.Model):
+    """
+    Запись ленты подписок пользователя.
+
+    Лента материализуется при публикации поста, чтобы страница подписок
+    читалась одним проходом по индексу (user, pub_date, post).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='feed_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='feed_entries')
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ('-pub_date', '-post_id')
+        unique_together = ('user', 'post')
+        indexes = [models.Index(fields=['user', 'pub_date', 'post'])]
+
+
+class UserStats(models.Model):
+    """
+    Счётчики профиля пользователя.
+
+    Хранятся отдельно и обновляются атомарно через F() при создании
+    и удалении постов и подписок, чтобы профиль не считал их COUNT'ами.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name='stats')
+    post_count = models.PositiveIntegerField(default=0)
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.user)
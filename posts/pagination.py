@@ -0,0 +1,243 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .cache import scope_version
+
+COUNT_KEY = 'posts:count:{version}:{key}'
+# С какого размера таблицы вместо COUNT(*) брать оценку планировщика
+APPROXIMATE_COUNT_FROM = 100000
+
+
+def encode_cursor(obj, field='pub_date', tiebreak='pk'):
+    """Собирает непрозрачный токен курсора из пары (дата, id)."""
+    raw = f'{getattr(obj, field).isoformat()}|{getattr(obj, tiebreak)}'
+    raw = raw.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Разбирает токен курсора обратно в пару (дата, id).
+
+    Для битого или подделанного токена возвращает None.
+    """
+    if not token:
+        return None
+    padding = '=' * (-len(token) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(token + padding).decode()
+        value, pk = raw.rsplit('|', 1)
+        value = parse_datetime(value)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if value is None:
+        return None
+    return value, pk
+
+
+class CursorPage:
+    """
+    Страница курсорной пагинации.
+
+    Повторяет ту часть интерфейса Page, которой пользуются шаблоны:
+    итерацию, len, has_next/has_previous и has_other_pages. Наличие
+    соседних страниц и их курсоры известны сразу после запроса
+    страницы, отдельных запросов к базе для них нет.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous,
+                 next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} objects>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Курсорная (keyset) пагинация по паре (field, tiebreak), новые сверху.
+
+    Страница — один запрос диапазона по индексу без COUNT(*) и без
+    OFFSET на per_page + 1 строк: лишняя строка говорит, есть ли
+    страница дальше. Поэтому глубина страницы на скорость не влияет.
+    tiebreak — уникальное в пределах выборки поле, которое различает
+    записи с одной датой, по умолчанию первичный ключ.
+    """
+
+    def __init__(self, object_list, per_page, field='pub_date',
+                 tiebreak='pk'):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.field = field
+        self.tiebreak = tiebreak
+
+    def _older(self, value, pk):
+        return (Q(**{f'{self.field}__lt': value})
+                | Q(**{self.field: value, f'{self.tiebreak}__lt': pk}))
+
+    def _newer(self, value, pk):
+        return (Q(**{f'{self.field}__gt': value})
+                | Q(**{self.field: value, f'{self.tiebreak}__gt': pk}))
+
+    def _cursors(self, after, before):
+        after = decode_cursor(after)
+        before = decode_cursor(before) if after is None else None
+        return after, before
+
+    def page_query(self, after=None, before=None):
+        """
+        Запрос страницы после курсора after или перед курсором before.
+
+        Страница перед курсором выбирается по возрастанию, чтобы взять
+        ближайшие к курсору строки, и разворачивается в get_page.
+        """
+        after, before = self._cursors(after, before)
+        if before is not None:
+            queryset = self.object_list.filter(
+                self._newer(*before)).order_by(self.field, self.tiebreak)
+        else:
+            queryset = self.object_list.order_by(f'-{self.field}',
+                                                 f'-{self.tiebreak}')
+            if after is not None:
+                queryset = queryset.filter(self._older(*after))
+        return queryset[:self.per_page + 1]
+
+    def get_page(self, after=None, before=None):
+        """
+        Возвращает страницу после курсора after или перед курсором before.
+
+        Без курсоров (или с битым токеном) отдаёт первую страницу.
+        Страница, открытая по курсору, всегда считает, что с его стороны
+        есть соседняя страница.
+        """
+        queryset = self.page_query(after, before)
+        rows = list(queryset)
+        extra = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        after, before = self._cursors(after, before)
+        if before is not None:
+            rows.reverse()
+            has_next, has_previous = True, extra
+        else:
+            has_next, has_previous = extra, after is not None
+        # Страница остаётся QuerySet'ом, но уже с загруженными строками:
+        # шаблоны и вью получают её без повторного запроса
+        object_list = queryset.all()
+        object_list._result_cache = rows
+        object_list._prefetch_done = True
+        return CursorPage(
+            object_list, self, has_next, has_previous,
+            next_cursor=(encode_cursor(rows[-1], self.field, self.tiebreak)
+                         if has_next and rows else None),
+            previous_cursor=(
+                encode_cursor(rows[0], self.field, self.tiebreak)
+                if has_previous and rows else None),
+        )
+
+
+def estimated_rows(model):
+    """
+    Оценка числа строк таблицы модели из статистики планировщика.
+
+    SQLite держит её в sqlite_stat1 после ANALYZE, PostgreSQL — в
+    pg_class.reltuples. Если статистики нет, возвращает None.
+    """
+    table = model._meta.db_table
+    if connection.vendor == 'sqlite':
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    elif connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples FROM pg_class WHERE relname = %s'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None:
+        return None
+    return int(str(row[0]).split()[0])
+
+
+def feed_count(queryset, scopes, estimate=False):
+    """
+    Число постов ленты для номерной пагинации без COUNT(*) на каждый запрос.
+
+    Точный COUNT(*) кэшируется до смены версии лент scopes (см.
+    posts.cache.scope_version), то есть до появления или удаления поста
+    в них; комментарии, подписки и посты других лент его не сбрасывают.
+    С estimate для выборки по всей таблице сначала берётся оценка
+    планировщика, которая появляется после ANALYZE (см. posts.db.analyze):
+    на таблицах от APPROXIMATE_COUNT_FROM строк ошибка в несколько
+    страниц в конце ленты незаметна, а точный COUNT(*) обходит всю
+    таблицу.
+    """
+    def count():
+        if estimate:
+            rows = estimated_rows(queryset.model)
+            if rows is not None and rows >= APPROXIMATE_COUNT_FROM:
+                return rows
+        return queryset.count()
+
+    key = COUNT_KEY.format(version=scope_version(*scopes),
+                           key=','.join(scopes))
+    return cache.get_or_set(key, count, settings.FEED_CACHE_TIMEOUT)
+
+
+def page_window(page, on_each_side=2, on_ends=1):
+    """
+    Номера страниц для панели пагинации вокруг текущей.
+
+    Вместо всех страниц — первые и последние on_ends и по on_each_side
+    соседей текущей. На месте пропуска стоит None, пропуск ровно в одну
+    страницу заменяется самой страницей.
+    """
+    number, last = page.number, page.paginator.num_pages
+    numbers = sorted({
+        *range(1, min(on_ends, last) + 1),
+        *range(max(number - on_each_side, 1),
+               min(number + on_each_side, last) + 1),
+        *range(max(last - on_ends + 1, 1), last + 1),
+    })
+    window = []
+    previous = 0
+    for num in numbers:
+        if num - previous == 2:
+            window.append(previous + 1)
+        elif num - previous > 2:
+            window.append(None)
+        window.append(num)
+        previous = num
+    return window
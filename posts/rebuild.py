@@ -0,0 +1,63 @@
+from django.db import connection
+from django.db.models import Max
+
+from . import search, stats, timeline
+from .cache import reset_feed_versions
+from .db import analyze
+
+
+def insert_batch(model, batch):
+    """
+    Вставляет пачку объектов bulk_create'ом и возвращает их id по порядку.
+
+    SQLite не возвращает id из bulk_create. Новые строки получают id
+    больше прежнего максимума, но с AUTOINCREMENT не обязательно подряд
+    от него, поэтому id дочитываются одним запросом. Вызывать внутри
+    транзакции, чтобы в выборку не попали чужие строки.
+    """
+    if connection.features.can_return_ids_from_bulk_insert:
+        model.objects.bulk_create(batch)
+        return [obj.pk for obj in batch]
+    last = model.objects.aggregate(last=Max('pk'))['last'] or 0
+    model.objects.bulk_create(batch)
+    return list(model.objects.filter(pk__gt=last).order_by('pk')
+                .values_list('pk', flat=True))
+
+
+def inserted_ids(model, objects, batch_size=None):
+    """
+    Вставляет объекты пачками по batch_size и возвращает их id.
+
+    Объекты берутся из итератора по одной пачке, так что в памяти
+    не держатся все сразу — только их id.
+    """
+    ids = []
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if batch_size and len(batch) >= batch_size:
+            ids.extend(insert_batch(model, batch))
+            batch = []
+    if batch:
+        ids.extend(insert_batch(model, batch))
+    return ids
+
+
+def rebuild_derived_data():
+    """
+    Пересобирает всё, что хранится денормализованно рядом с постами.
+
+    Нужно после массовой загрузки через bulk_create, которая обходит
+    сигналы: ленты подписок, счётчики профилей и комментариев,
+    поисковый индекс, статистику планировщика и версии кэша лент.
+    Возвращает сводку по шагам.
+    """
+    summary = {
+        'feed_entries': timeline.rebuild_timelines(),
+        'fixed_stats': stats.recount_stats(),
+        'posts_with_comment_count': stats.recount_comment_counts(),
+        'search_index': search.rebuild_index(),
+        'analyzed': analyze(),
+    }
+    reset_feed_versions()
+    return summary
@@ -0,0 +1,126 @@
+import random
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .cache import reset_feed_versions
+
+PIN_COOKIE = 'primary_pin'
+READ_METHODS = ('GET', 'HEAD')
+
+_state = threading.local()
+
+
+def replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+def current_replica():
+    """Реплика, с которой читает текущий поток, или None."""
+    return getattr(_state, 'replica', None)
+
+
+@contextmanager
+def reading_from_replica():
+    """
+    Направляет чтения внутри блока на одну из реплик.
+
+    Реплика выбирается один раз на блок, чтобы все запросы страницы
+    видели один и тот же снимок базы. Без реплик ничего не меняется.
+    """
+    previous = current_replica()
+    replicas = replica_aliases()
+    _state.replica = random.choice(replicas) if replicas else None
+    try:
+        yield _state.replica
+    finally:
+        _state.replica = previous
+
+
+def is_pinned(request):
+    """Пользователь недавно писал в базу и пока читает с основной."""
+    return PIN_COOKIE in request.COOKIES
+
+
+def replica_reads(view):
+    """
+    Отдаёт чтения вью репликам, если запрос только читает.
+
+    Пользователь, который только что что-то записал, получает куку
+    PIN_COOKIE (см. ReplicaPinMiddleware) и, пока она жива, читает
+    с основной базы, чтобы сразу увидеть свой пост или комментарий.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in READ_METHODS or is_pinned(request):
+            return view(request, *args, **kwargs)
+        with reading_from_replica():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Читает с реплики внутри reading_from_replica, остальное — с default.
+
+    Запись всегда идёт в основную базу. Схему реплики получают вместе
+    с копией данных (см. replicate), поэтому миграции на них не гоняются.
+    На реплики уходят только модели ленты: сессии и пользователи для
+    входа читаются с основной, иначе отстающая реплика не узнала бы
+    только что созданную сессию.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != 'posts':
+            return None
+        return current_replica() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if {obj1._state.db, obj2._state.db} <= aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replica_aliases():
+            return False
+        return None
+
+
+def replicate():
+    """
+    Копирует основную базу SQLite в файлы реплик через backup API.
+
+    Локальная замена настоящей репликации: запускается периодически
+    командой replicate, так что реплики отстают на её интервал. После
+    копии версии кэша лент сбрасываются — иначе страницы, собранные
+    по отстающей реплике, остались бы в кэше и после её обновления.
+    Команда работает в своём процессе, поэтому сброс доходит до
+    веб-воркеров только через общий для процессов кэш (CACHES в
+    settings_production). Возвращает список обновлённых реплик.
+    """
+    primary = connections[DEFAULT_DB_ALIAS]
+    if primary.vendor != 'sqlite':
+        raise ValueError('Копирование через backup API есть только у SQLite')
+    primary.ensure_connection()
+    copied = []
+    for alias in replica_aliases():
+        name = connections[alias].settings_dict['NAME']
+        if name == primary.settings_dict['NAME']:
+            continue
+        target = sqlite3.connect(name)
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+        copied.append(alias)
+    if copied:
+        reset_feed_versions()
+    return copied
@@ -0,0 +1,178 @@
+import base64
+import binascii
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+WORD_RE = re.compile(r'\w+')
+
+
+def is_available():
+    """Полнотекстовый индекс есть только у SQLite (FTS5)."""
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """
+    Превращает пользовательский запрос в безопасное выражение FTS5 MATCH.
+
+    Каждое слово берётся в кавычки, чтобы спецсимволы запроса не ломали
+    синтаксис FTS5, последнее слово ищется по префиксу.
+    """
+    words = WORD_RE.findall(query.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def index_post(post):
+    """Записывает текст поста в полнотекстовый индекс."""
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                       [post.pk])
+        cursor.execute(f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                       f'VALUES (%s, %s)', [post.pk, post.text])
+
+
+def index_posts(post_ids):
+    """Добавляет в полнотекстовый индекс пачку новых постов одним запросом."""
+    if not is_available() or not post_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                       f'SELECT id, text FROM {Post._meta.db_table} '
+                       f'WHERE id IN ({placeholders})', list(post_ids))
+
+
+def unindex_post(post_id):
+    """Убирает пост из полнотекстового индекса."""
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                       [post_id])
+
+
+def rebuild_index():
+    """
+    Пересобирает полнотекстовый индекс по таблице постов.
+
+    Нужно после массовых вставок и update(), которые обходят сигналы.
+    """
+    if not is_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                       f'SELECT id, text FROM {Post._meta.db_table}')
+        cursor.execute(f'SELECT count(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def filter_posts(queryset, query):
+    """Оставляет в queryset только посты, подходящие под запрос."""
+    match = match_expression(query)
+    if match is None:
+        return queryset.none()
+    if not is_available():
+        return queryset.filter(text__icontains=query)
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [match],
+    ))
+
+
+def encode_cursor(rank, pk):
+    raw = f'{rank!r}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    if not token:
+        return None
+    padding = '=' * (-len(token) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(token + padding).decode()
+        rank, pk = raw.rsplit('|', 1)
+        return float(rank), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+class SearchPage:
+    """
+    Страница результатов поиска с курсором по паре (релевантность, id).
+
+    Интерфейс совпадает с CursorPage, поэтому выводится тем же
+    шаблоном пагинации. Листать можно только вперёд.
+    """
+    is_cursor = True
+    previous_cursor = None
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return False
+
+    def has_other_pages(self):
+        return self.has_next()
+
+
+def search_posts(query, per_page, after=None):
+    """
+    Ищет посты по запросу, самые релевантные сверху.
+
+    Ранжирование — bm25 из FTS5, страница выбирается курсором after
+    без OFFSET. Посты страницы подгружаются одним запросом для ленты.
+    """
+    match = match_expression(query)
+    if match is None:
+        return SearchPage([], None)
+    if not is_available():
+        posts = list(filter_posts(Post.objects.for_feed(),
+                                  query)[:per_page])
+        return SearchPage(posts, None)
+
+    sql = (f'SELECT rowid, rank FROM {FTS_TABLE} '
+           f'WHERE {FTS_TABLE} MATCH %s')
+    params = [match]
+    cursor_value = decode_cursor(after)
+    if cursor_value is not None:
+        sql += ' AND (rank > %s OR (rank = %s AND rowid > %s))'
+        params += [cursor_value[0], cursor_value[0], cursor_value[1]]
+    sql += ' ORDER BY rank, rowid LIMIT %s'
+    params.append(per_page + 1)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+    posts = Post.objects.for_feed().in_bulk([pk for pk, _ in rows])
+    return SearchPage([posts[pk] for pk, _ in rows if pk in posts],
+                      next_cursor)
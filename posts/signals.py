@@ -0,0 +1,137 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import search, timeline
+from .cache import bump_feed_version, bump_scope_versions
+from .models import Comment, Follow, Group, Post, UserStats
+from .stats import change_stats
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_feed(sender, **kwargs):
+    bump_feed_version()
+
+
+def post_scopes(post):
+    """Ленты, в которых стоит пост: главная, автора и группы."""
+    scopes = ['index', f'author:{post.author_id}']
+    if post.group_id:
+        scopes.append(f'group:{post.group_id}')
+    return scopes
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    """Запоминает прежнюю группу поста, чтобы сменить версию и её ленты."""
+    if not instance._state.adding:
+        instance._saved_group_id = Post.objects.filter(
+            pk=instance.pk).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def bump_post_scopes(sender, instance, created, **kwargs):
+    """
+    Меняет версии лент, где пост появился или откуда ушёл.
+
+    Правка текста состава лент не меняет, поэтому версии меняются
+    только у нового поста и у поста, перенесённого в другую группу.
+    """
+    if created:
+        bump_scope_versions(*post_scopes(instance))
+        return
+    saved_group_id = getattr(instance, '_saved_group_id', None)
+    if saved_group_id != instance.group_id:
+        bump_scope_versions(*(f'group:{group}' for group in
+                              {saved_group_id, instance.group_id} - {None}))
+
+
+@receiver(post_delete, sender=Post)
+def bump_deleted_post_scopes(sender, instance, **kwargs):
+    bump_scope_versions(*post_scopes(instance))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follow_scope(sender, instance, **kwargs):
+    bump_scope_versions(f'follow:{instance.user_id}')
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_follow(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill_follow(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def drop_follow(sender, instance, **kwargs):
+    timeline.drop_follow(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=User)
+def create_stats(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created:
+        change_stats(instance.author_id, 'post_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    change_stats(instance.author_id, 'post_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, **kwargs):
+    if created:
+        change_stats(instance.author_id, 'follower_count', 1)
+        change_stats(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    change_stats(instance.author_id, 'follower_count', -1)
+    change_stats(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    Post.objects.filter(pk=instance.post_id, comment_count__gt=0).update(
+        comment_count=F('comment_count') - 1)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
@@ -0,0 +1,125 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+def count_stats(user_id):
+    """Считает счётчики пользователя заново по исходным таблицам."""
+    return {
+        'post_count': Post.objects.filter(author_id=user_id).count(),
+        'follower_count': Follow.objects.filter(author_id=user_id).count(),
+        'following_count': Follow.objects.filter(user_id=user_id).count(),
+    }
+
+
+def change_stats(user_id, field, delta):
+    """
+    Атомарно сдвигает счётчик field пользователя на delta.
+
+    Счётчик не уходит ниже нуля. Если строки счётчиков ещё нет, при
+    увеличении она создаётся с честно посчитанными значениями. При
+    уменьшении отсутствующую строку не создаём: пользователь может
+    как раз удаляться каскадом.
+    """
+    stats = UserStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        stats = stats.filter(**{f'{field}__gte': -delta})
+    updated = stats.update(**{field: F(field) + delta})
+    if not updated and delta > 0:
+        UserStats.objects.get_or_create(user_id=user_id,
+                                        defaults=count_stats(user_id))
+
+
+def bulk_change_stats(field, deltas):
+    """
+    Увеличивает счётчик field сразу многим пользователям.
+
+    deltas — словарь {user_id: приращение}. Пользователи с одинаковым
+    приращением сдвигаются одним UPDATE, недостающие строки счётчиков
+    создаются с честно посчитанными значениями.
+    """
+    by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        by_delta[delta].append(user_id)
+    for delta, user_ids in by_delta.items():
+        UserStats.objects.filter(user_id__in=user_ids).update(
+            **{field: F(field) + delta})
+    missing = set(deltas) - set(UserStats.objects.filter(
+        user_id__in=list(deltas)).values_list('user_id', flat=True))
+    for user_id in missing:
+        UserStats.objects.get_or_create(user_id=user_id,
+                                        defaults=count_stats(user_id))
+
+
+def add_comment_counts(counts):
+    """
+    Увеличивает счётчики комментариев постов: {post_id: приращение}.
+
+    Посты с одинаковым приращением сдвигаются одним UPDATE.
+    """
+    by_delta = defaultdict(list)
+    for post_id, delta in counts.items():
+        by_delta[delta].append(post_id)
+    for delta, post_ids in by_delta.items():
+        Post.objects.filter(pk__in=post_ids).update(
+            comment_count=F('comment_count') + delta)
+
+
+def get_stats(user):
+    """Возвращает счётчики пользователя, создавая их при необходимости."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        stats, _ = UserStats.objects.get_or_create(
+            user_id=user.pk, defaults=count_stats(user.pk))
+        return stats
+
+
+def recount_stats():
+    """
+    Пересчитывает счётчики всех пользователей и чинит расхождения.
+
+    Возвращает число пользователей, у которых счётчики разошлись
+    с данными.
+    """
+    def counts(queryset, field):
+        return dict(queryset.values_list(field).annotate(total=Count('pk'))
+                    .order_by())
+
+    post_counts = counts(Post.objects.all(), 'author_id')
+    follower_counts = counts(Follow.objects.all(), 'author_id')
+    following_counts = counts(Follow.objects.all(), 'user_id')
+    stored = {stats.user_id: stats for stats in UserStats.objects.all()}
+
+    fixed = 0
+    with transaction.atomic():
+        for user_id in User.objects.values_list('pk', flat=True).iterator():
+            actual = {
+                'post_count': post_counts.get(user_id, 0),
+                'follower_count': follower_counts.get(user_id, 0),
+                'following_count': following_counts.get(user_id, 0),
+            }
+            stats = stored.get(user_id)
+            if stats is None:
+                UserStats.objects.create(user_id=user_id, **actual)
+                fixed += 1
+            elif any(getattr(stats, field) != value
+                     for field, value in actual.items()):
+                UserStats.objects.filter(user_id=user_id).update(**actual)
+                fixed += 1
+    return fixed
+
+
+def recount_comment_counts():
+    """Пересчитывает сохранённые счётчики комментариев всех постов."""
+    comments = Comment.objects.filter(post=OuterRef('pk')).order_by()
+    return Post.objects.update(comment_count=Coalesce(Subquery(
+        comments.values('post').annotate(total=Count('pk')).values('total')
+    ), 0))
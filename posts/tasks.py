@@ -0,0 +1,43 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BACKGROUND_WORKERS,
+            thread_name_prefix='posts-worker',
+        )
+    return _executor
+
+
+def _run(func, args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Фоновая задача %s упала', func.__name__)
+    finally:
+        connection.close()
+
+
+def run_in_background(func, *args):
+    """
+    Выполняет func(*args) в пуле фоновых потоков после коммита транзакции.
+
+    Задача видит уже сохранённые данные, а запрос её не ждёт. Если пул
+    отключён настройкой BACKGROUND_WORKERS = 0 (так в тестах), задача
+    выполняется сразу после коммита.
+    """
+    if not settings.BACKGROUND_WORKERS:
+        transaction.on_commit(lambda: func(*args))
+        return
+    transaction.on_commit(
+        lambda: _get_executor().submit(_run, func, args))
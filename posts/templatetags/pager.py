@@ -0,0 +1,10 @@
+from django import template
+
+from posts.pagination import page_window as window
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_window(page, on_each_side=2, on_ends=1):
+    return window(page, on_each_side, on_ends)
@@ -0,0 +1,10 @@
+from django import template
+
+from posts.thumbnails import thumbnail_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail_url(image, variant='card'):
+    return thumbnail_url(image, variant)
@@ -0,0 +1,93 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from . import constants as ct
+
+User = get_user_model()
+
+API_INDEX = reverse('api_index')
+API_FOLLOW = reverse('api_follow')
+
+
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username=ct.USERNAME1)
+        cls.author = User.objects.create(username=ct.USERNAME2)
+        cls.group = Group.objects.create(title='Группа', slug=ct.SLUG1)
+        Post.objects.bulk_create(
+            Post(text=f'Пост {num}', author=cls.author,
+                 group=cls.group if num % 2 else None)
+            for num in range(25)
+        )
+        cls.post = Post.objects.create(text='Последний', author=cls.user)
+
+    def setUp(self):
+        self.client = Client()
+
+    def get_json(self, url, data=None, status=200):
+        response = self.client.get(url, data)
+        self.assertEqual(response.status_code, status)
+        if response.streaming:
+            return json.loads(b''.join(response.streaming_content))
+        return json.loads(response.content)
+
+    def test_index_cursor_walks_all_posts(self):
+        """Курсор проходит всю ленту без повторов и пропусков."""
+        seen = []
+        data = self.get_json(API_INDEX, {'limit': 10})
+        seen += [post['id'] for post in data['results']]
+        self.assertIsNone(data['previous'])
+        while data['next']:
+            data = self.get_json(API_INDEX,
+                                 {'limit': 10, 'after': data['next']})
+            seen += [post['id'] for post in data['results']]
+        expected = list(Post.objects.order_by('-pub_date', '-pk')
+                        .values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_selectable_fields(self):
+        data = self.get_json(API_INDEX, {'fields': 'id,author'})
+        self.assertEqual(data['results'][0],
+                         {'id': self.post.pk, 'author': ct.USERNAME1})
+        data = self.get_json(API_INDEX, {'fields': 'id,password'},
+                             status=400)
+        self.assertIn('password', data['detail'])
+
+    def test_group_and_profile(self):
+        data = self.get_json(reverse('api_group', args=[ct.SLUG1]),
+                             {'limit': 100})
+        self.assertEqual(len(data['results']), 12)
+        self.assertTrue(all(post['group'] == ct.SLUG1
+                            for post in data['results']))
+        data = self.get_json(reverse('api_profile', args=[ct.USERNAME1]))
+        self.assertEqual([post['id'] for post in data['results']],
+                         [self.post.pk])
+        self.get_json(reverse('api_profile', args=['nobody']), status=404)
+
+    def test_follow_needs_login(self):
+        self.get_json(API_FOLLOW, status=401)
+        Follow.objects.create(user=self.user, author=self.author)
+        self.client.force_login(self.user)
+        data = self.get_json(API_FOLLOW, {'limit': 5})
+        self.assertEqual(len(data['results']), 5)
+        self.assertTrue(all(post['author'] == ct.USERNAME2
+                            for post in data['results']))
+
+    def test_post_with_comments(self):
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Коммент')
+        data = self.get_json(reverse('api_post', args=[self.post.pk]))
+        self.assertEqual(data['post']['text'], 'Последний')
+        self.assertEqual(data['results'][0]['text'], 'Коммент')
+        self.assertEqual(data['results'][0]['author'], ct.USERNAME2)
+        self.assertIsNone(data['next'])
+
+    def test_bad_limit_and_method(self):
+        self.get_json(API_INDEX, {'limit': 1000}, status=400)
+        response = self.client.post(API_INDEX)
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,106 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.deletion import delete_object, get_progress
+from posts.models import Comment, FeedEntry, Follow, Group, Post, UserStats
+from . import constants as ct
+
+User = get_user_model()
+
+
+class DeletionTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username=ct.USERNAME1)
+        self.reader = User.objects.create(username=ct.USERNAME2)
+        self.group = Group.objects.create(title='Группа', slug=ct.SLUG1)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.author, author=self.reader)
+        for num in range(7):
+            post = Post.objects.create(text=f'Пост {num}',
+                                       author=self.author, group=self.group)
+            Comment.objects.create(post=post, author=self.reader,
+                                   text='Коммент')
+        self.reader_post = Post.objects.create(
+            text='Пост читателя', author=self.reader, group=self.group)
+        Comment.objects.create(post=self.reader_post, author=self.author,
+                               text='Коммент автора')
+
+    def test_user_cascade_in_batches(self):
+        """Автор удаляется со всеми постами, комментами и подписками."""
+        reports = []
+        deleted = delete_object('auth.User', self.author.pk, batch_size=3,
+                                report=lambda state: reports.append(
+                                    dict(state)))
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertEqual(list(Post.objects.all()), [self.reader_post])
+        self.assertEqual(Comment.objects.count(), 0)
+        self.assertEqual(Follow.objects.count(), 0)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(deleted['posts.Post'], 7)
+        self.assertEqual(deleted['posts.Comment'], 8)
+        self.assertGreater(len(reports), 3)
+        stats = UserStats.objects.get(user=self.reader)
+        self.assertEqual((stats.follower_count, stats.following_count),
+                         (0, 0))
+        self.assertEqual(Post.objects.get().comment_count, 0)
+        progress = get_progress(User, self.author.pk)
+        self.assertEqual(progress['status'], 'done')
+
+    def test_group_detaches_posts(self):
+        """Удаление группы обнуляет ссылку у постов, а не удаляет их."""
+        delete_object('posts.Group', self.group.pk, batch_size=3)
+        self.assertEqual(Post.objects.count(), 8)
+        self.assertFalse(Post.objects.filter(group__isnull=False).exists())
+
+    def test_purge_command(self):
+        out = StringIO()
+        call_command('purge', 'posts.Post', self.reader_post.pk, stdout=out)
+        self.assertIn('posts.Comment: 1', out.getvalue())
+        self.assertFalse(Post.objects.filter(
+            pk=self.reader_post.pk).exists())
+
+    def test_admin_delete_hands_off(self):
+        """Админка не удаляет каскад в запросе, а ставит задачу в фон."""
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        client = Client()
+        client.force_login(admin)
+        url = reverse('admin:auth_user_delete', args=[self.author.pk])
+        response = client.get(url)
+        self.assertContains(response, 'Post')
+        response = client.post(url, {'post': 'yes'}, follow=True)
+        self.assertContains(response, 'удаляется в фоне')
+        # В TestCase коммита не бывает, поэтому задача только в очереди
+        self.assertEqual(get_progress(User, self.author.pk)['status'],
+                         'queued')
+        self.assertTrue(User.objects.filter(pk=self.author.pk).exists())
+
+    def test_staff_deletes_without_internal_model_perms(self):
+        """Для служебных моделей вне админки права не нужны."""
+        staff = User.objects.create_user('staff', password='pass',
+                                         is_staff=True)
+        staff.user_permissions.set(Permission.objects.filter(codename__in=[
+            'delete_user', 'delete_post', 'delete_comment', 'delete_follow',
+        ]))
+        client = Client()
+        client.force_login(staff)
+        url = reverse('admin:auth_user_delete', args=[self.author.pk])
+        response = client.get(url)
+        self.assertFalse(response.context['perms_lacking'])
+        Permission.objects.get(codename='delete_post').user_set.remove(staff)
+        response = client.get(url)
+        self.assertEqual(set(response.context['perms_lacking']), {'post'})
+
+    def test_admin_shows_deletion_progress(self):
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        client = Client()
+        client.force_login(admin)
+        delete_object('posts.Post', self.reader_post.pk)
+        response = client.get(reverse('admin:posts_post_deletion',
+                                      args=[self.reader_post.pk]))
+        self.assertContains(response, 'удалено')
+        self.assertContains(response, 'posts.Comment')
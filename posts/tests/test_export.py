@@ -0,0 +1,79 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post
+from . import constants as ct
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username=ct.USERNAME1)
+        cls.reader = User.objects.create(username=ct.USERNAME2)
+        cls.posts = [Post.objects.create(text=f'Пост {num}',
+                                         author=cls.author)
+                     for num in range(5)]
+        Comment.objects.create(post=cls.posts[0], author=cls.reader,
+                               text='Коммент, с запятой')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def export(self, *args):
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        stderr = StringIO()
+        call_command('export', *args, '--output', path, stderr=stderr)
+        return path, stderr.getvalue()
+
+    def test_ndjson_gzip(self):
+        path, summary = self.export('posts', '--gzip')
+        with gzip.open(path, 'rt') as file:
+            rows = [json.loads(line) for line in file]
+        self.assertEqual([row['id'] for row in rows],
+                         [post.pk for post in self.posts])
+        self.assertEqual(rows[0]['author_username'], ct.USERNAME1)
+        self.assertIn('5 строк', summary)
+
+    def test_csv(self):
+        path, _ = self.export('comments', '--format', 'csv')
+        with open(path, newline='') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['text'], 'Коммент, с запятой')
+        path, _ = self.export('follows', '--format', 'csv')
+        with open(path, newline='') as file:
+            self.assertEqual(len(list(csv.DictReader(file))), 1)
+
+    def test_incremental(self):
+        """Запуск с --since из прошлой сводки выгружает только новое."""
+        _, summary = self.export('posts')
+        since = summary.split('--since ')[1].strip()
+        new_post = Post.objects.create(text='Новый', author=self.author)
+        path, _ = self.export('posts', '--since', since)
+        with open(path) as file:
+            rows = [json.loads(line) for line in file]
+        self.assertEqual([row['id'] for row in rows], [new_post.pk])
+
+    def test_admin_action_streams(self):
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        client = Client()
+        client.force_login(admin)
+        response = client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'export_ndjson',
+            '_selected_action': [self.posts[1].pk, self.posts[2].pk],
+        })
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines],
+                         [self.posts[1].pk, self.posts[2].pk])
@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+from . import constants as ct
+
+User = get_user_model()
+
+POSTS_FEED = reverse('posts_feed')
+GROUP_FEED = reverse('group_feed', args=[ct.SLUG1])
+AUTHOR_FEED = reverse('author_feed', args=[ct.USERNAME1])
+
+
+class AtomFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username=ct.USERNAME1)
+        cls.other = User.objects.create(username=ct.USERNAME2)
+        cls.group = Group.objects.create(title='Группа', slug=ct.SLUG1)
+        cls.post = Post.objects.create(text='Пост в группе',
+                                       author=cls.author, group=cls.group)
+        Post.objects.create(text='Чужой пост', author=cls.other)
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_feeds_list_their_posts(self):
+        response = self.client.get(POSTS_FEED)
+        self.assertEqual(response['Content-Type'],
+                         'application/atom+xml; charset=utf-8')
+        self.assertContains(response, 'Пост в группе')
+        self.assertContains(response, 'Чужой пост')
+        response = self.client.get(GROUP_FEED)
+        self.assertContains(response, 'Пост в группе')
+        self.assertNotContains(response, 'Чужой пост')
+        response = self.client.get(AUTHOR_FEED)
+        self.assertContains(response, 'Пост в группе')
+        self.assertNotContains(response, 'Чужой пост')
+        self.assertEqual(
+            self.client.get(reverse('group_feed', args=['none'])).status_code,
+            404)
+
+    def test_polling_gets_304_from_one_query(self):
+        """Опрос без изменений получает 304 за один запрос MAX."""
+        for url in (POSTS_FEED, GROUP_FEED, AUTHOR_FEED):
+            response = self.client.get(url)
+            self.assertTrue(response.has_header('Last-Modified'))
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(len(queries), 1)
+            response = self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            self.assertEqual(response.status_code, 304)
+
+    def test_new_post_changes_etag(self):
+        etag = self.client.get(GROUP_FEED)['ETag']
+        Post.objects.create(text='Новый пост', author=self.other,
+                            group=self.group)
+        response = self.client.get(GROUP_FEED, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Новый пост')
+
+    def test_unrelated_activity_keeps_etag(self):
+        """Посты и комменты вне ленты не сбрасывают её ETag."""
+        etags = {url: self.client.get(url)['ETag']
+                 for url in (GROUP_FEED, AUTHOR_FEED)}
+        Post.objects.create(text='Пост без группы', author=self.other)
+        Comment.objects.create(post=self.post, author=self.other,
+                               text='Коммент')
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_deleted_post_changes_etag(self):
+        """Удаление старого поста меняет ETag, хотя дата ленты та же."""
+        old = Post.objects.create(text='Старый пост', author=self.author,
+                                  group=self.group)
+        Post.objects.filter(pk=old.pk).update(
+            pub_date=self.post.pub_date - timedelta(days=1))
+        etag = self.client.get(GROUP_FEED)['ETag']
+        Post.objects.get(pk=old.pk).delete()
+        response = self.client.get(GROUP_FEED, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_moved_post_changes_old_group_etag(self):
+        """Перенос поста в другую группу меняет ETag прежней группы."""
+        Post.objects.create(text='Свежий', author=self.other,
+                            group=self.group)
+        etag = self.client.get(GROUP_FEED)['ETag']
+        self.post.group = Group.objects.create(title='Другая',
+                                               slug=ct.SLUG2)
+        self.post.save()
+        response = self.client.get(GROUP_FEED, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Пост в группе')
+
+    def test_pages_link_their_feeds(self):
+        response = self.client.get(reverse('group_page', args=[ct.SLUG1]))
+        self.assertContains(response, f'href="{GROUP_FEED}"')
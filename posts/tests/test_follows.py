@@ -0,0 +1,83 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.follows import follow, unfollow
+from posts.models import FeedEntry, Follow, Post, UserStats
+from . import constants as ct
+
+User = get_user_model()
+
+FOLLOW_IMPORT = reverse('api_follow_import')
+
+
+class FollowTests(TestCase):
+    def setUp(self):
+        self.reader = User.objects.create(username=ct.USERNAME1)
+        self.author = User.objects.create(username=ct.USERNAME2)
+        self.post = Post.objects.create(text='Пост', author=self.author)
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_follow_is_idempotent(self):
+        """Повторная подписка не создаёт дубль и не сдвигает счётчики."""
+        self.assertTrue(follow(self.reader.pk, self.author.pk))
+        self.assertFalse(follow(self.reader.pk, self.author.pk))
+        self.assertFalse(follow(self.reader.pk, self.reader.pk))
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(self.stats(self.author).follower_count, 1)
+        self.assertTrue(FeedEntry.objects.filter(user=self.reader,
+                                                 post=self.post).exists())
+        self.assertTrue(unfollow(self.reader.pk, self.author.pk))
+        self.assertFalse(unfollow(self.reader.pk, self.author.pk))
+        self.assertEqual(self.stats(self.author).follower_count, 0)
+        self.assertFalse(FeedEntry.objects.exists())
+
+    def test_follow_views_need_post(self):
+        """GET по кнопкам подписки ничего не меняет."""
+        response = self.client.get(reverse('profile_follow',
+                                           args=[ct.USERNAME2]))
+        self.assertEqual(response.status_code, 405)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_import_endpoint(self):
+        extra = [User.objects.create(username=f'extra{num}')
+                 for num in range(3)]
+        authors = [user.username for user in extra]
+        authors += [ct.USERNAME2, ct.USERNAME2, ct.USERNAME1, 'nobody']
+        response = self.client.post(FOLLOW_IMPORT,
+                                    json.dumps({'authors': authors}),
+                                    content_type='application/json')
+        self.assertEqual(response.json(),
+                         {'created': 4, 'unknown': ['nobody']})
+        self.assertEqual(self.stats(self.reader).following_count, 4)
+        self.assertEqual(self.stats(self.author).follower_count, 1)
+        self.assertTrue(FeedEntry.objects.filter(user=self.reader,
+                                                 post=self.post).exists())
+        response = self.client.post(FOLLOW_IMPORT, {'authors': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_import_command(self):
+        users = [User.objects.create(username=f'user{num}')
+                 for num in range(5)]
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as file:
+            file.writelines(f'{follower.username},{author.username}\n'
+                            for follower in users for author in users)
+            file.write(f'{ct.USERNAME1},{ct.USERNAME2}\n')
+            file.write('nobody,user0\n')
+            file.flush()
+            call_command('import_follows', file.name, '--batch-size', '7',
+                         stdout=StringIO())
+        self.assertEqual(Follow.objects.count(), 5 * 4 + 1)
+        for user in users:
+            self.assertEqual(self.stats(user).follower_count, 4)
+            self.assertEqual(self.stats(user).following_count, 4)
+        self.assertEqual(FeedEntry.objects.get().user, self.reader)
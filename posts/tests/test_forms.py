@@ -108,6 +108,9 @@ class PostFormTests(TestCase):
         )
         comm_count_auth = self.post.comments.count()
         self.assertEqual(comm_count_auth, 1, 'Коммент не отправился')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1,
+                         'Счётчик комментов не увеличился')
         self.guest_client.post(
             self.add_comment_url,
             data=form_data_guest,
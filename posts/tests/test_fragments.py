@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+from posts.views import COUNT_PAGE_POSTS
+from . import constants as ct
+
+User = get_user_model()
+
+INDEX_FRAGMENT = reverse('index_fragment')
+GROUP_FRAGMENT = reverse('group_fragment', args=[ct.SLUG1])
+PROFILE_FRAGMENT = reverse('profile_fragment', args=[ct.USERNAME1])
+
+
+class PostListFragmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username=ct.USERNAME1)
+        cls.group = Group.objects.create(title='Группа', slug=ct.SLUG1)
+        Post.objects.bulk_create(
+            Post(text=f'Пост {num}', author=cls.author, group=cls.group)
+            for num in range(COUNT_PAGE_POSTS + 3))
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_fragment_continues_page_by_cursor(self):
+        """Фрагмент отдаёт только карточки и продолжает страницу."""
+        for page_url, url in ((ct.INDEX, INDEX_FRAGMENT),
+                              (ct.GROUP1, GROUP_FRAGMENT),
+                              (ct.PROFILE1, PROFILE_FRAGMENT)):
+            with self.subTest(url=url):
+                page = self.client.get(page_url)
+                cursor = page.context['next_cursor']
+                self.assertContains(page, f'data-cursor="{cursor}"')
+                self.assertContains(page, f'data-url="{url}"')
+
+                response = self.client.get(url, {'after': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertNotContains(response, '<html')
+                self.assertEqual(response.content.count(b'class="card '), 3)
+                self.assertNotIn('X-Next-Cursor', response)
+
+    def test_fragment_sets_next_cursor_header(self):
+        response = self.client.get(INDEX_FRAGMENT)
+        self.assertEqual(response.content.count(b'class="card '),
+                         COUNT_PAGE_POSTS)
+        rest = self.client.get(INDEX_FRAGMENT,
+                               {'after': response['X-Next-Cursor']})
+        self.assertEqual(rest.content.count(b'class="card '), 3)
+
+    def test_last_page_has_no_load_more(self):
+        response = self.client.get(ct.INDEX, {'page': 2})
+        self.assertIsNone(response.context['next_cursor'])
+        self.assertNotContains(response, 'js-load-more')
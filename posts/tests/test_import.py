@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase
+
+from posts import search
+from posts.models import Comment, FeedEntry, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+class ImportNdjsonTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Group.objects.create(title='Группа', slug='group', description='')
+
+    def run_import(self, rows, **options):
+        fd, path = tempfile.mkstemp(suffix='.ndjson')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            for row in rows:
+                file.write(row if isinstance(row, str) else json.dumps(row))
+                file.write('\n')
+        out = StringIO()
+        call_command('import_ndjson', path, stdout=out, stderr=StringIO(),
+                     **options)
+        return out.getvalue()
+
+    def sample(self):
+        return [
+            {'type': 'post', 'ref': 'a', 'author': 'author',
+             'group': 'group', 'text': 'первый импорт',
+             'pub_date': '2015-01-02T03:04:05+00:00'},
+            {'type': 'post', 'ref': 'b', 'author': 'author',
+             'text': 'второй импорт'},
+            {'type': 'comment', 'post_ref': 'a', 'author': 'reader',
+             'text': 'комментарий', 'created': '2015-01-03T00:00:00'},
+            {'type': 'comment', 'post_ref': 'a', 'author': 'author',
+             'text': 'ответ'},
+            'не json',
+            {'type': 'post', 'author': 'stranger', 'text': 'чужой'},
+        ]
+
+    def test_import_updates_derived_data_per_batch(self):
+        """Импорт сохраняет даты и сразу обновляет ленты и счётчики."""
+        output = self.run_import(self.sample(), batch_size=2)
+        first = Post.objects.get(text='первый импорт')
+        self.assertEqual(first.pub_date.year, 2015)
+        self.assertEqual(first.group.slug, 'group')
+        self.assertEqual(first.comment_count, 2)
+        self.assertEqual(
+            Comment.objects.get(text='комментарий').created.year, 2015)
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 2)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).post_count, 2)
+        self.assertFalse(Post.objects.filter(text='чужой').exists())
+        self.assertIn('broken: 1', output)
+        self.assertIn('skipped_posts: 1', output)
+        self.assertEqual(len(search.search_posts('импорт', 10)), 2)
+
+    def test_create_missing_and_defer_rebuild(self):
+        """--create-missing заводит авторов, --defer-rebuild пересобирает."""
+        self.run_import(self.sample(), create_missing=True,
+                        defer_rebuild=True)
+        self.assertTrue(User.objects.filter(username='stranger').exists())
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertEqual(
+            Post.objects.aggregate(total=Sum('comment_count'))['total'],
+            Comment.objects.count())
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 2)
+
+    def test_comment_to_missing_post_is_skipped(self):
+        """Коммент к несуществующему посту пропускается, пачка грузится."""
+        post = Post.objects.create(text='есть', author=self.author)
+        output = self.run_import([
+            {'type': 'comment', 'post_id': post.pk, 'author': 'reader',
+             'text': 'к посту'},
+            {'type': 'comment', 'post_id': post.pk + 1000,
+             'author': 'reader', 'text': 'в никуда'},
+        ])
+        self.assertEqual(list(Comment.objects.values_list('text', flat=True)),
+                         ['к посту'])
+        self.assertIn('skipped_comments: 1', output)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
@@ -0,0 +1,69 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.metrics import Histogram, registry
+from posts.models import Post
+from . import constants as ct
+
+User = get_user_model()
+
+METRICS = reverse('metrics')
+
+
+class PerformanceMetricsTests(TestCase):
+    def setUp(self):
+        registry.clear()
+        self.user = User.objects.create(username=ct.USERNAME1)
+        Post.objects.create(text='Пост', author=self.user)
+        self.client = Client()
+
+    def test_server_timing_header(self):
+        """Ответ несёт Server-Timing с SQL, шаблонами и полным временем."""
+        response = self.client.get(ct.INDEX)
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertRegex(timing, r'tpl;dur=[\d.]+')
+        self.assertRegex(timing, r'total;dur=[\d.]+')
+        template = float(re.search(r'tpl;dur=([\d.]+)', timing).group(1))
+        total = float(re.search(r'total;dur=([\d.]+)', timing).group(1))
+        self.assertGreater(template, 0)
+        self.assertLessEqual(template, total)
+
+    def test_metrics_exposes_histograms_by_view(self):
+        """/metrics/ отдаёт гистограммы в разрезе имени вью."""
+        self.client.get(ct.INDEX)
+        self.client.get(ct.INDEX)
+        self.client.get(ct.PROFILE1)
+        body = self.client.get(METRICS).content.decode()
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram',
+                      body)
+        self.assertIn('yatube_request_duration_seconds_count{view="index"} 2',
+                      body)
+        self.assertIn('yatube_sql_queries_count{view="profile"} 1', body)
+        self.assertIn('yatube_template_duration_seconds_bucket'
+                      '{view="index",le="+Inf"} 2', body)
+
+    @override_settings(METRICS_ALLOWED_IPS=[])
+    def test_metrics_forbidden_for_strangers(self):
+        """Чужим адресам гистограммы не отдаются."""
+        response = self.client.get(METRICS)
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN='секрет')
+    def test_metrics_by_token(self):
+        """За прокси сборщик проходит только с токеном."""
+        self.assertEqual(self.client.get(
+            METRICS, HTTP_AUTHORIZATION='Bearer секрет').status_code, 200)
+        self.assertEqual(self.client.get(
+            METRICS, HTTP_AUTHORIZATION='Bearer чужой').status_code, 403)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram((1, 5))
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(value)
+        self.assertEqual(list(histogram.cumulative()),
+                         [(1, 2), (5, 3), ('+Inf', 4)])
+        self.assertEqual(histogram.count, 4)
@@ -1,7 +1,15 @@
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Paginator
 from django.test import Client, TestCase
 
-from posts.models import Post, Group, Follow
+from posts.models import Comment, Post, Group, Follow
+from posts.pagination import (
+    CursorPaginator, encode_cursor, estimated_rows, feed_count, page_window)
+from posts.rebuild import rebuild_derived_data
+from posts.timeline import rebuild_timelines
 from . import constants as ct
 
 User = get_user_model()
@@ -26,6 +34,7 @@ class PaginatorViewsTest(TestCase):
             for post_num in range(number_of_posts)
         ]
         Post.objects.bulk_create(posts)
+        rebuild_timelines()
         self.templates_pages_name = {
             'INDEX_URL': ct.INDEX,
             'GROUP_URL': ct.GROUP1,
@@ -50,3 +59,106 @@ class PaginatorViewsTest(TestCase):
                 self.assertEqual(
                     len(response.context.get('page').object_list), 3
                 )
+
+    def test_cursor_pages_walk_whole_feed(self):
+        """Проверка: курсорная пагинация проходит ленту без пропусков."""
+        for reverse_name in self.templates_pages_name.values():
+            with self.subTest(reverse_name=reverse_name):
+                first = self.authorized_client.get(
+                    reverse_name + '?after=').context.get('page')
+                cursor = encode_cursor(list(first.object_list)[-1])
+                self.assertEqual(cursor, first.next_cursor)
+                second = self.authorized_client.get(
+                    reverse_name + '?after=' + cursor).context.get('page')
+                self.assertEqual(len(second.object_list), 3)
+                self.assertFalse(second.has_next())
+                self.assertTrue(second.has_previous())
+                back = self.authorized_client.get(
+                    reverse_name + '?before=' + second.previous_cursor
+                ).context.get('page')
+                self.assertEqual(list(back.object_list),
+                                 list(first.object_list))
+
+    def test_cursor_page_is_one_query(self):
+        """Проверка: страница и её соседи — один запрос, без EXISTS."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        with self.assertNumQueries(1):
+            first = paginator.get_page()
+            self.assertTrue(first.has_next())
+            self.assertFalse(first.has_previous())
+        with self.assertNumQueries(1):
+            last = paginator.get_page(after=first.next_cursor)
+            self.assertEqual(len(last), 3)
+            self.assertFalse(last.has_next())
+            self.assertTrue(last.has_previous())
+        with self.assertNumQueries(1):
+            back = paginator.get_page(before=last.previous_cursor)
+            self.assertFalse(back.has_previous())
+            self.assertEqual(list(back), list(first))
+
+    def test_broken_cursor_returns_first_page(self):
+        """Проверка: битый курсор отдаёт первую страницу."""
+        response = self.authorized_client.get(ct.INDEX + '?after=broken!')
+        self.assertEqual(len(response.context.get('page').object_list), 10)
+
+
+class WindowedPaginatorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username=ct.USERNAME1)
+        Post.objects.bulk_create(
+            Post(text=f'Пост {num}', author=cls.user) for num in range(95))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_window_shows_ends_and_neighbours(self):
+        """Проверка: панель — края и соседи текущей страницы."""
+        paginator = Paginator(range(500), 10)
+        self.assertEqual(page_window(paginator.page(1)),
+                         [1, 2, 3, None, 50])
+        self.assertEqual(page_window(paginator.page(25)),
+                         [1, None, 23, 24, 25, 26, 27, None, 50])
+        self.assertEqual(page_window(paginator.page(4)),
+                         [1, 2, 3, 4, 5, 6, None, 50])
+        self.assertEqual(page_window(Paginator(range(30), 10).page(2)),
+                         [1, 2, 3])
+
+    def test_paginator_bar_is_windowed(self):
+        """Проверка: на странице нет ссылок на все страницы подряд."""
+        response = Client().get(ct.INDEX + '?page=1')
+        self.assertContains(response, '?page=3"')
+        self.assertContains(response, '?page=10"')
+        self.assertNotContains(response, '?page=6"')
+
+    def test_count_cached_until_feed_changes(self):
+        """Проверка: COUNT(*) кэшируется до смены версии своей ленты."""
+        posts = self.user.posts.all()
+        scopes = (f'author:{self.user.pk}',)
+        self.assertEqual(feed_count(posts, scopes), 95)
+        other = User.objects.create(username=ct.USERNAME2)
+        Post.objects.create(text='Чужой пост', author=other)
+        Comment.objects.create(post=posts[0], author=other, text='Коммент')
+        Follow.objects.create(user=other, author=self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(feed_count(posts, scopes), 95)
+        posts[0].delete()
+        self.assertEqual(feed_count(posts, scopes), 94)
+
+    def test_large_table_count_is_estimated(self):
+        with mock.patch('posts.pagination.estimated_rows',
+                        return_value=250000):
+            self.assertEqual(
+                feed_count(Post.objects.all(), ('index',), estimate=True),
+                250000)
+        cache.clear()
+        with mock.patch('posts.pagination.estimated_rows',
+                        return_value=95):
+            self.assertEqual(
+                feed_count(Post.objects.all(), ('index',), estimate=True),
+                95)
+
+    def test_analyze_enables_estimate(self):
+        """Проверка: оценка доступна после ANALYZE из rebuild_derived_data."""
+        self.assertTrue(rebuild_derived_data()['analyzed'])
+        self.assertEqual(estimated_rows(Post), 95)
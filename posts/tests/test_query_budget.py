@@ -0,0 +1,207 @@
+import json
+import os
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.search import rebuild_index
+from posts.stats import recount_stats
+from posts.timeline import rebuild_timelines
+
+User = get_user_model()
+
+USERS = 20
+GROUPS = 4
+POSTS_PER_USER = 15
+COMMENTS_PER_POST = 3
+
+# Бюджет каждого маршрута: (запросов к базе не больше, секунд не больше).
+# Запросы считаются на холодном кэше, время — с запасом на медленные машины.
+BUDGETS = {
+    'index': (5, 0.5),
+    'group_page': (5, 0.5),
+    'profile': (5, 0.5),
+    'index_fragment': (4, 0.5),
+    'group_fragment': (5, 0.5),
+    'profile_fragment': (5, 0.5),
+    'post': (5, 0.5),
+    'post_edit': (5, 0.5),
+    'new_post': (3, 0.5),
+    'search': (4, 0.5),
+    'follow_index': (5, 0.5),
+    'add_comment': (8, 0.5),
+    'profile_follow': (10, 0.5),
+    'profile_unfollow': (9, 0.5),
+    '404': (2, 0.5),
+    '500': (2, 0.5),
+    'metrics': (2, 0.5),
+    'posts_feed': (4, 0.5),
+    'group_feed': (5, 0.5),
+    'author_feed': (5, 0.5),
+    'api_index': (4, 0.5),
+    'api_group': (5, 0.5),
+    'api_profile': (5, 0.5),
+    'api_follow': (4, 0.5),
+    'api_post': (5, 0.5),
+    'api_follow_import': (13, 0.5),
+}
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Бюджеты запросов и времени для всех маршрутов posts.urls.
+
+    База наполняется правдоподобными данными, каждый маршрут вызывается
+    на холодном кэше, число запросов и время ответа сравниваются с
+    бюджетом из BUDGETS. Так N+1 во вью и шаблонах ловится до прода.
+    С переменной окружения QUERY_BUDGET_REPORT печатается сводка.
+    """
+    results = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [User.objects.create(username=f'user{num}')
+                 for num in range(USERS)]
+        groups = [Group.objects.create(title=f'Группа {num}',
+                                       slug=f'group-{num}')
+                  for num in range(GROUPS)]
+        Post.objects.bulk_create(
+            Post(text=f'Пост {num} пользователя {user.username}',
+                 author=user, group=groups[num % GROUPS])
+            for user in users for num in range(POSTS_PER_USER)
+        )
+        posts = list(Post.objects.all())
+        Comment.objects.bulk_create(
+            Comment(post=post, author=users[(post.pk + num) % USERS],
+                    text=f'Коммент {num}')
+            for post in posts for num in range(COMMENTS_PER_POST)
+        )
+        Post.objects.update(comment_count=COMMENTS_PER_POST)
+        Follow.objects.bulk_create(
+            Follow(user=user, author=users[(num + shift) % USERS])
+            for num, user in enumerate(users) for shift in (1, 2, 3)
+        )
+        rebuild_timelines()
+        recount_stats()
+        rebuild_index()
+        cls.users = users
+        cls.reader = users[0]
+        cls.author = users[1]
+        cls.stranger = users[10]
+        cls.post = Post.objects.filter(author=cls.reader).first()
+        cls.group = groups[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if os.environ.get('QUERY_BUDGET_REPORT'):
+            sys.stdout.write('\nroute               queries  ms\n')
+            for name, (queries, seconds) in sorted(cls.results.items()):
+                sys.stdout.write(
+                    f'{name:<20}{queries:>7}  {seconds * 1000:.1f}\n')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def measure(self, name, method, url, data=None, **extra):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(self.client, method)(url, data, **extra)
+            if response.streaming:
+                # Потоковый ответ ходит в базу, пока его читают
+                response.body = b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        self.results[name] = (len(queries), elapsed)
+        max_queries, max_seconds = BUDGETS[name]
+        self.assertLessEqual(
+            len(queries), max_queries,
+            f'{name}: {len(queries)} запросов при бюджете {max_queries}:\n'
+            + '\n'.join(query['sql'] for query in queries))
+        self.assertLessEqual(
+            elapsed, max_seconds,
+            f'{name}: {elapsed:.3f} с при бюджете {max_seconds} с')
+        return response
+
+    def post_kwargs(self):
+        return {'username': self.reader.username, 'post_id': self.post.pk}
+
+    def test_every_route_has_budget(self):
+        from posts.urls import urlpatterns
+        names = {pattern.name for pattern in urlpatterns}
+        self.assertEqual(names - set(BUDGETS), set())
+
+    def test_feeds(self):
+        self.measure('index', 'get', reverse('index'))
+        self.measure('group_page', 'get',
+                     reverse('group_page', args=[self.group.slug]))
+        self.measure('profile', 'get',
+                     reverse('profile', args=[self.author.username]))
+        self.measure('follow_index', 'get', reverse('follow_index'))
+        self.measure('search', 'get', reverse('search'), {'q': 'пост'})
+
+    def test_fragments(self):
+        self.measure('index_fragment', 'get', reverse('index_fragment'))
+        self.measure('group_fragment', 'get',
+                     reverse('group_fragment', args=[self.group.slug]))
+        self.measure('profile_fragment', 'get',
+                     reverse('profile_fragment', args=[self.author.username]))
+
+    def test_post_pages(self):
+        self.measure('post', 'get', reverse('post',
+                                            kwargs=self.post_kwargs()))
+        self.measure('post_edit', 'get',
+                     reverse('post_edit', kwargs=self.post_kwargs()))
+        self.measure('new_post', 'get', reverse('new_post'))
+        response = self.measure(
+            'add_comment', 'post',
+            reverse('add_comment', kwargs=self.post_kwargs()),
+            {'text': 'Новый коммент'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_follow_routes(self):
+        self.measure('profile_follow', 'post',
+                     reverse('profile_follow',
+                             args=[self.stranger.username]))
+        self.measure('profile_unfollow', 'post',
+                     reverse('profile_unfollow',
+                             args=[self.stranger.username]))
+        authors = [user.username for user in self.users]
+        response = self.measure('api_follow_import', 'post',
+                                reverse('api_follow_import'),
+                                json.dumps({'authors': authors}),
+                                content_type='application/json')
+        self.assertEqual(response.json()['created'], USERS - 4)
+
+    def test_feeds_atom(self):
+        self.measure('posts_feed', 'get', reverse('posts_feed'))
+        self.measure('group_feed', 'get',
+                     reverse('group_feed', args=[self.group.slug]))
+        self.measure('author_feed', 'get',
+                     reverse('author_feed', args=[self.author.username]))
+
+    def test_api(self):
+        self.measure('api_index', 'get', reverse('api_index'),
+                     {'fields': 'id,text,author,group,thumbnail'})
+        self.measure('api_group', 'get',
+                     reverse('api_group', args=[self.group.slug]))
+        self.measure('api_profile', 'get',
+                     reverse('api_profile', args=[self.author.username]))
+        self.measure('api_follow', 'get', reverse('api_follow'))
+        self.measure('api_post', 'get',
+                     reverse('api_post', args=[self.post.pk]))
+
+    def test_error_pages(self):
+        self.measure('404', 'get', reverse('404'))
+        self.measure('500', 'get', reverse('500'))
+
+    def test_metrics(self):
+        self.measure('metrics', 'get', reverse('metrics'))
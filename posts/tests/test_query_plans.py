@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from posts.feeds import newest_post_query
+from posts.models import Comment, FeedEntry, Follow, Group, Post
+from posts.pagination import CursorPaginator
+from posts.timeline import user_timeline
+from posts.views import COUNT_PAGE_COMMENTS, COUNT_PAGE_POSTS
+from . import constants as ct
+
+User = get_user_model()
+
+
+class QueryPlanTests(TestCase):
+    """
+    Запросы ленты идут по индексам.
+
+    EXPLAIN QUERY PLAN каждого запроса должен называть индекс таблицы
+    и не содержать полного прохода по ней и временного B-дерева для
+    сортировки, иначе на больших таблицах страница сортирует всё подряд.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username=ct.USERNAME1)
+        cls.author = User.objects.create(username=ct.USERNAME2)
+        cls.group = Group.objects.create(title='Группа', slug=ct.SLUG1)
+        cls.post = Post.objects.create(text='Пост', author=cls.author,
+                                       group=cls.group)
+
+    def assertUsesIndex(self, queryset, table):
+        plan = queryset.explain()
+        self.assertNotIn('TEMP B-TREE', plan, plan)
+        self.assertNotRegex(plan, rf'SCAN (TABLE )?{table}\b(?! USING)',
+                            plan)
+        self.assertRegex(plan, rf'{table} USING (COVERING )?INDEX', plan)
+
+    def feed_queries(self):
+        posts = Post.objects.for_feed()
+        return {
+            'index': posts,
+            'group': self.group.posts.for_feed(),
+            'profile': self.author.posts.for_feed(),
+        }
+
+    def test_feed_pages(self):
+        for name, posts in self.feed_queries().items():
+            with self.subTest(name=name):
+                self.assertUsesIndex(posts[:COUNT_PAGE_POSTS], 'posts_post')
+
+    def test_feed_cursor_pages(self):
+        for name, posts in self.feed_queries().items():
+            paginator = CursorPaginator(posts, COUNT_PAGE_POSTS)
+            with self.subTest(name=name):
+                self.assertUsesIndex(paginator.page_query(),
+                                     'posts_post')
+
+    def test_follow_pages(self):
+        entries = user_timeline(self.user)
+        self.assertUsesIndex(entries[:COUNT_PAGE_POSTS], 'posts_feedentry')
+        # Порядок по умолчанию не тянет JOIN с постами
+        self.assertUsesIndex(
+            FeedEntry.objects.filter(user=self.user)[:COUNT_PAGE_POSTS],
+            'posts_feedentry')
+        paginator = CursorPaginator(entries, COUNT_PAGE_POSTS,
+                                    tiebreak='post_id')
+        self.assertUsesIndex(paginator.page_query(), 'posts_feedentry')
+
+    def test_feed_polls(self):
+        """Опрос Atom-ленты — одна строка по индексу, без COUNT."""
+        for args in (({},), ({'group__slug': ct.SLUG1}, 'group'),
+                     ({'author__username': ct.USERNAME2}, 'author')):
+            with self.subTest(args=args):
+                self.assertUsesIndex(newest_post_query(*args), 'posts_post')
+
+    def test_comments_page(self):
+        paginator = CursorPaginator(self.post.comments.for_post(),
+                                    COUNT_PAGE_COMMENTS, field='created')
+        self.assertUsesIndex(paginator.page_query(),
+                             'posts_comment')
+        self.assertUsesIndex(
+            Comment.objects.filter(post=self.post)[:COUNT_PAGE_COMMENTS],
+            'posts_comment')
+
+    def test_follow_lookup(self):
+        self.assertUsesIndex(
+            Follow.objects.filter(user=self.user, author=self.author),
+            'posts_follow')
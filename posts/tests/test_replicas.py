@@ -0,0 +1,142 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import (Client, SimpleTestCase, TestCase,
+                         TransactionTestCase, override_settings)
+
+from posts.cache import feed_version, scope_version
+from posts.models import Post
+from posts.replicas import (PIN_COOKIE, ReplicaRouter, current_replica,
+                            reading_from_replica, replicate)
+from yatube import settings_production
+from . import constants as ct
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username=ct.USERNAME1)
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.reads = []
+
+    def db_for_read(self, router, model, **hints):
+        self.reads.append(current_replica())
+        return DEFAULT_DB_ALIAS
+
+    def get(self, url):
+        with mock.patch.object(ReplicaRouter, 'db_for_read', autospec=True,
+                               side_effect=self.db_for_read):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_router_reads_from_replica_only_inside_block(self):
+        """Чтения уходят на реплику только внутри reading_from_replica."""
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Post), DEFAULT_DB_ALIAS)
+        with reading_from_replica():
+            self.assertEqual(router.db_for_read(Post), 'replica')
+            self.assertEqual(router.db_for_write(Post), DEFAULT_DB_ALIAS)
+            self.assertIsNone(router.db_for_read(Session))
+            self.assertIsNone(router.db_for_read(User))
+        self.assertIsNone(current_replica())
+        self.assertIs(router.allow_migrate('replica', 'posts'), False)
+
+    def test_feed_views_read_from_replica(self):
+        """Лента, группа, профиль, пост и подписки читают с реплики."""
+        for url in (ct.INDEX, ct.PROFILE1, ct.FOLLOW,
+                    f'/{ct.USERNAME1}/{self.post.pk}/'):
+            with self.subTest(url=url):
+                self.reads = []
+                self.get(url)
+                self.assertIn('replica', self.reads)
+
+    def test_user_reads_primary_after_write(self):
+        """После записи пользователь какое-то время читает с основной."""
+        response = self.client.post(ct.NEW_POST, {'text': 'Новый пост'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.get(ct.INDEX)
+        self.assertNotIn('replica', self.reads)
+
+    def test_reads_do_not_pin(self):
+        response = self.get(ct.INDEX)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+FILE_REPLICA = 'file_replica'
+
+
+@override_settings(DATABASE_REPLICAS=[FILE_REPLICA])
+class ReplicateTests(TransactionTestCase):
+    """replicate() копирует основную базу в файл реплики по-настоящему."""
+    databases = {DEFAULT_DB_ALIAS, FILE_REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        connections.databases[FILE_REPLICA] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(cls.directory.name, 'replica.sqlite3'),
+        }
+        connections.ensure_defaults(FILE_REPLICA)
+        connections.prepare_test_settings(FILE_REPLICA)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[FILE_REPLICA].close()
+        del connections.databases[FILE_REPLICA]
+        delattr(connections._connections, FILE_REPLICA)
+        cls.directory.cleanup()
+
+    def test_routed_read_sees_copied_rows(self):
+        user = User.objects.create(username=ct.USERNAME1)
+        Post.objects.create(text='До копии', author=user)
+        self.assertEqual(replicate(), [FILE_REPLICA])
+        Post.objects.create(text='После копии', author=user)
+        with reading_from_replica():
+            texts = list(Post.objects.values_list('text', flat=True))
+            self.assertEqual(Post.objects.db, FILE_REPLICA)
+        self.assertEqual(texts, ['До копии'])
+
+
+class ReplicateResetTests(SimpleTestCase):
+    """Сброс версий после копии из команды replicate видят веб-воркеры."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_reset_from_command_process_reaches_workers(self):
+        caches = {'default': dict(settings_production.CACHES['default'],
+                                  LOCATION=self.directory)}
+        with override_settings(CACHES=caches):
+            versions = feed_version(), scope_version('group:1')
+            # replicate() заканчивается этим сбросом в процессе команды
+            subprocess.run(
+                [sys.executable, '-c',
+                 'import django; django.setup(); '
+                 'from posts.cache import reset_feed_versions; '
+                 'reset_feed_versions()'],
+                cwd=settings.BASE_DIR, check=True,
+                env=dict(os.environ,
+                         DJANGO_SETTINGS_MODULE='yatube.settings_production',
+                         YATUBE_CACHE_DIR=self.directory))
+            self.assertNotEqual(feed_version(), versions[0])
+            self.assertNotEqual(scope_version('group:1'), versions[1])
@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+from posts.search import match_expression, rebuild_index
+
+User = get_user_model()
+SEARCH = reverse('search')
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create(username='pushkin')
+        self.post = Post.objects.create(
+            text='Мороз и солнце; день чудесный!', author=self.user)
+        Post.objects.create(text='Буря мглою небо кроет', author=self.user)
+
+    def found(self, query, **params):
+        response = self.client.get(SEARCH, {'q': query, **params})
+        return response.context.get('page')
+
+    def test_search_finds_posts_by_words_and_prefix(self):
+        """Поиск находит посты по словам без учёта регистра и по префиксу."""
+        self.assertEqual(list(self.found('МОРОЗ')), [self.post])
+        self.assertEqual(list(self.found('солн')), [self.post])
+        self.assertEqual(list(self.found('лето')), [])
+
+    def test_search_index_follows_edits_and_deletes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        self.post.text = 'Зимнее утро'
+        self.post.save()
+        self.assertEqual(list(self.found('мороз')), [])
+        self.assertEqual(list(self.found('утро')), [self.post])
+        self.post.delete()
+        self.assertEqual(list(self.found('утро')), [])
+
+    def test_search_results_ranked_and_paginated_by_cursor(self):
+        """Релевантные посты выше, страницы листаются курсором."""
+        posts = Post.objects.bulk_create(
+            Post(text=f'Ветер {num}', author=self.user) for num in range(12)
+        )
+        Post.objects.create(text='Ветер ветер ветер', author=self.user)
+        rebuild_index()
+        first = self.found('ветер')
+        self.assertEqual(first[0].text, 'Ветер ветер ветер')
+        self.assertEqual(len(first), 10)
+        second = self.found('ветер', after=first.next_cursor)
+        self.assertEqual(len(second), 3)
+        self.assertFalse(second.has_next())
+        found = {post.pk for post in first} | {post.pk for post in second}
+        self.assertEqual(len(found), len(posts) + 1)
+
+    def test_special_characters_do_not_break_search(self):
+        """Спецсимволы FTS5 в запросе не роняют поиск."""
+        self.assertEqual(match_expression('"*" AND -'), '"and"*')
+        self.assertEqual(self.client.get(SEARCH, {'q': '"('}).status_code,
+                         200)
@@ -0,0 +1,56 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import F, Sum
+from django.test import TestCase
+
+from posts.models import (Comment, FeedEntry, Follow, Group, Post,
+                          UserStats)
+from posts.rebuild import inserted_ids
+
+User = get_user_model()
+
+
+class SeedCommandTests(TestCase):
+    def test_seed_fills_database_consistently(self):
+        """seed наполняет базу и пересобирает денормализованные данные."""
+        call_command('seed', users=15, groups=3, posts_per_user=4,
+                     follows=3, comments=2, images=0, batch_size=7, seed=1,
+                     stdout=StringIO())
+        self.assertEqual(UserStats.objects.count(), 15)
+        self.assertEqual(
+            UserStats.objects.aggregate(total=Sum('post_count'))['total'],
+            Post.objects.count())
+        self.assertEqual(
+            Post.objects.aggregate(total=Sum('comment_count'))['total'],
+            Comment.objects.count())
+        self.assertEqual(
+            FeedEntry.objects.count(),
+            Post.objects.filter(author__following__isnull=False).count())
+        self.assertFalse(
+            Follow.objects.filter(user_id=F('author_id')).exists())
+
+    def test_seed_after_deleted_rows(self):
+        """Id новых строк дочитываются, даже если автоинкремент ушёл вперёд."""
+        User.objects.create(username='удалённый').delete()
+        call_command('seed', users=5, groups=0, posts_per_user=2,
+                     follows=0, comments=0, images=0, seed=1,
+                     no_rebuild=True, stdout=StringIO())
+        self.assertEqual(
+            Post.objects.filter(author__username__startswith='seed').count(),
+            Post.objects.count())
+
+    def test_inserted_ids_streams_batches(self):
+        """Объекты вставляются пачками по мере чтения итератора."""
+        groups = (Group(title=f'Группа {num}', slug=f'group-{num}')
+                  for num in range(5))
+        with mock.patch.object(Group.objects, 'bulk_create',
+                               wraps=Group.objects.bulk_create) as insert:
+            ids = inserted_ids(Group, groups, batch_size=2)
+        self.assertEqual([len(call[0][0]) for call in insert.call_args_list],
+                         [2, 2, 1])
+        self.assertEqual(
+            ids, list(Group.objects.order_by('pk').values_list(
+                'pk', flat=True)))
@@ -0,0 +1,31 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from posts.db import apply_sqlite_pragmas
+
+
+class SqliteTuningTests(TestCase):
+    def pragma(self, name):
+        return connection.connection.execute(f'PRAGMA {name}').fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -2000})
+    def test_pragmas_applied_to_new_connection(self):
+        """Прагмы из SQLITE_PRAGMAS выставляются новому соединению."""
+        connection.ensure_connection()
+        previous = self.pragma('cache_size')
+        self.addCleanup(connection.connection.execute,
+                        f'PRAGMA cache_size = {previous}')
+        apply_sqlite_pragmas(sender=None, connection=connection)
+        self.assertEqual(self.pragma('cache_size'), -2000)
+
+    @override_settings(SQLITE_PRAGMAS={'journal_mode': 'WAL',
+                                       'busy_timeout': 5000})
+    def test_benchmark_compares_profiles(self):
+        out = StringIO()
+        call_command('bench_sqlite', readers=1, writers=1, seconds=0.2,
+                     rows=100, stdout=out)
+        self.assertIn('по умолчанию', out.getvalue())
+        self.assertIn('Ускорение', out.getvalue())
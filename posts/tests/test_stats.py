@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, Follow, Post, UserStats
+from . import constants as ct
+
+User = get_user_model()
+
+
+class UserStatsTests(TestCase):
+    def setUp(self):
+        self.reader = User.objects.create(username=ct.USERNAME1)
+        self.author = User.objects.create(username=ct.USERNAME2)
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_posts_and_follows(self):
+        """Счётчики меняются при создании и удалении постов и подписок."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).post_count, 1)
+        self.assertEqual(self.stats(self.author).follower_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        post.delete()
+        follow.delete()
+        self.assertEqual(self.stats(self.author).post_count, 0)
+        self.assertEqual(self.stats(self.author).follower_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_comment_count_follows_comments(self):
+        """Счётчик комментариев поста меняется при любом создании коммента."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        comment = Comment.objects.create(post=post, author=self.reader,
+                                         text='Коммент')
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        comment.text = 'Правка'
+        comment.save()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 0)
+
+    def test_profile_renders_counters_from_stats(self):
+        """Профиль выводит счётчики без отдельных COUNT-запросов."""
+        Post.objects.create(text='Пост', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(ct.PROFILE2)
+        self.assertContains(response, 'Подписчиков: 1')
+        self.assertContains(response, 'Записей: 1')
+        self.assertEqual(response.context.get('following'), 1)
+        follow_counts = [query for query in queries
+                         if 'COUNT' in query['sql']
+                         and 'posts_follow' in query['sql']]
+        self.assertEqual(follow_counts, [])
+
+    def test_repair_stats_fixes_drift(self):
+        """Команда repair_stats исправляет разошедшиеся счётчики."""
+        Post.objects.create(text='Пост', author=self.author)
+        UserStats.objects.filter(user=self.author).update(post_count=7)
+        UserStats.objects.filter(user=self.reader).delete()
+        out = StringIO()
+        call_command('repair_stats', stdout=out)
+        self.assertIn('2', out.getvalue())
+        self.assertEqual(self.stats(self.author).post_count, 1)
+        self.assertTrue(UserStats.objects.filter(user=self.reader).exists())
+
+    def test_deleting_user_with_posts_and_follows(self):
+        """Удаление пользователя не спотыкается о его счётчики."""
+        Post.objects.create(text='Пост', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.author.delete()
+        self.assertEqual(self.stats(self.reader).following_count, 0)
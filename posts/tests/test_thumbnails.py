@@ -0,0 +1,72 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.test import Client, TestCase
+
+from posts.models import Post
+from posts.thumbnails import (
+    attach_thumbnails, generate_thumbnails, thumbnail_url,
+)
+from . import constants as ct
+
+User = get_user_model()
+
+
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        settings.MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username=ct.USERNAME1)
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def uploaded(self):
+        return SimpleUploadedFile(name='small.gif', content=ct.SMALL_GIF,
+                                  content_type='image/gif')
+
+    def test_thumbnail_url_falls_back_until_generated(self):
+        """До нарезки отдаётся исходная картинка, после — миниатюра."""
+        post = Post.objects.create(text='Пост', author=self.user,
+                                   image=self.uploaded())
+        self.assertEqual(thumbnail_url(post.image), post.image.url)
+        generate_thumbnails(post.pk)
+        url = thumbnail_url(post.image)
+        self.assertNotEqual(url, post.image.url)
+        self.assertTrue(url.startswith(settings.MEDIA_URL + 'cache/'))
+
+    def test_new_post_schedules_thumbnails(self):
+        """Создание поста с картинкой ставит нарезку в фоновую очередь."""
+        with mock.patch('posts.views.run_in_background') as background:
+            self.client.post(ct.NEW_POST, data={'text': 'Пост',
+                                                'image': self.uploaded()})
+        post = Post.objects.get(text='Пост')
+        background.assert_called_once_with(generate_thumbnails, post.pk)
+
+    def test_attach_thumbnails_makes_one_lookup_per_page(self):
+        """Миниатюры страницы достаются одним запросом к хранилищу."""
+        posts = [Post.objects.create(text=f'Пост {num}', author=self.user,
+                                     image=self.uploaded())
+                 for num in range(3)]
+        generate_thumbnails(posts[0].pk)
+        generate_thumbnails(posts[1].pk)
+        cache.clear()
+        with self.assertNumQueries(1):
+            attach_thumbnails(posts)
+        for post in posts:
+            self.assertEqual(post.thumbnail_url, thumbnail_url(post.image))
+        self.assertEqual(posts[2].thumbnail_url, posts[2].image.url)
+        with self.assertNumQueries(0):
+            attach_thumbnails(posts)
@@ -0,0 +1,49 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+
+from posts.models import FeedEntry, Follow, Post
+from . import constants as ct
+
+User = get_user_model()
+
+
+class FeedEntryTests(TestCase):
+    def setUp(self):
+        self.reader = User.objects.create(username=ct.USERNAME1)
+        self.author = User.objects.create(username=ct.USERNAME2)
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.old_post = Post.objects.create(text='Старый пост',
+                                            author=self.author)
+
+    def feed(self):
+        response = self.client.get(ct.FOLLOW)
+        return list(response.context.get('page').object_list)
+
+    def test_follow_backfills_and_unfollow_cleans_feed(self):
+        """Подписка добавляет старые посты в ленту, отписка убирает."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.feed(), [self.old_post])
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(FeedEntry.objects.exists())
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост сразу попадает в ленты подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+        entry = FeedEntry.objects.get(user=self.reader, post=new_post)
+        self.assertEqual(entry.pub_date, new_post.pub_date)
+
+    def test_rebuild_feed_command(self):
+        """Команда rebuild_feed восстанавливает ленты по подпискам."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        FeedEntry.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_feed', stdout=out)
+        self.assertIn('1', out.getvalue())
+        self.assertEqual(self.feed(), [self.old_post])
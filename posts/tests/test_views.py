@@ -1,14 +1,22 @@
+import os
 import shutil
+import subprocess
+import sys
 import tempfile
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase, override_settings
+from django.test import (Client, SimpleTestCase, TestCase,
+                         override_settings)
 from django.urls import reverse
 from django import forms
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-from posts.models import Group, Post, Follow
+from posts.cache import feed_version
+from posts.models import Comment, Group, Post, Follow
+from yatube import settings_production
 from . import constants as ct
 
 User = get_user_model()
@@ -147,28 +155,54 @@ class PostPagesTests(TestCase):
         response = self.authorized_client1.get(ct.GROUP1)
         self.assertIsNone(response.context.get('post'))
 
+    def test_nav_links_to_own_profile(self):
+        """Имя пользователя в шапке ведёт на его профиль."""
+        response = self.authorized_client1.get(ct.NEW_POST)
+        self.assertContains(response, f'href="{ct.PROFILE1}"')
+
     def test_index_cash(self):
         """ Проверка кэширования главной страницы """
         html_0 = self.guest_client.get(ct.INDEX)
-        Post.objects.create(
-            text='Тестовый текст2',
-            author=self.user1,
-            group=self.group_obj2,
-        )
+        Post.objects.filter(id=self.post.id).update(text='Тихая правка')
         html_1 = self.guest_client.get(ct.INDEX)
         self.assertHTMLEqual(str(html_0.content), str(html_1.content))
         cache.clear()
         html_0 = self.guest_client.get(ct.INDEX)
         self.assertHTMLNotEqual(str(html_0.content), str(html_1.content))
 
+    def test_index_cache_invalidated_on_post_write(self):
+        """Новый и удалённый пост сразу сбрасывают кэш главной."""
+        self.guest_client.get(ct.INDEX)
+        new_post = Post.objects.create(
+            text='Тестовый текст2',
+            author=self.user1,
+            group=self.group_obj2,
+        )
+        self.assertContains(self.guest_client.get(ct.INDEX), new_post.text)
+        new_post.delete()
+        self.assertNotContains(self.guest_client.get(ct.INDEX),
+                               new_post.text)
+
+    def test_index_cache_depends_on_page_and_user(self):
+        """Разные страницы и пользователи не делят кэш главной."""
+        Post.objects.bulk_create(
+            Post(text=f'Пост {num}', author=self.user1)
+            for num in range(10)
+        )
+        self.guest_client.get(ct.INDEX)
+        response = self.guest_client.get(ct.INDEX + '?page=2')
+        self.assertContains(response, self.post.text)
+        response = self.authorized_client1.get(ct.INDEX)
+        self.assertContains(response, 'Редактировать')
+
     def test_following_and_unfollowing(self):
         """Авторизованный пользователь может подписываться и отписываться."""
-        response = self.authorized_client2.get(ct.PROFILE_FOLLOW)
+        response = self.authorized_client2.post(ct.PROFILE_FOLLOW)
         follow = self.user2.follower.get(author=self.user1)
         self.assertRedirects(response, ct.PROFILE1)
         self.assertEqual(follow.author, self.user1, 'Подписка не создалась')
         count_follow1 = self.user2.follower.filter(author=self.user1).count()
-        response = self.authorized_client2.get(ct.PROFILE_UNFOLLOW)
+        response = self.authorized_client2.post(ct.PROFILE_UNFOLLOW)
         count_follow2 = self.user2.follower.filter(author=self.user1).count()
         self.assertRedirects(response, ct.PROFILE1)
         self.assertNotEqual(count_follow1, count_follow2,
@@ -189,3 +223,125 @@ class PostPagesTests(TestCase):
         response2 = self.authorized_client1.get(ct.FOLLOW)
         self.assertEqual(response1.context.get('post'), following_post)
         self.assertNotEqual(response2.context.get('post'), following_post)
+
+    @override_settings(CACHES={
+        'default': {
+                'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        }
+    })
+    def test_feed_queries_do_not_depend_on_page_size(self):
+        """Число запросов ленты не растёт вместе с числом постов."""
+        def count_queries():
+            counts = {}
+            for reverse_name in self.templates_pages_name_no_form:
+                with CaptureQueriesContext(connection) as queries:
+                    self.authorized_client1.get(reverse_name)
+                counts[reverse_name] = len(queries)
+            return counts
+
+        before = count_queries()
+        for num in range(9):
+            group = Group.objects.create(title=f'Группа {num}',
+                                         slug=f'group-{num}')
+            author = User.objects.create(username=f'author{num}')
+            Follow.objects.create(user=self.user1, author=author)
+            Post.objects.create(text=f'Пост {num}', author=author,
+                                group=group)
+        self.assertEqual(count_queries(), before)
+
+    def test_post_comments_paginated_with_constant_queries(self):
+        """Комменты поста выводятся страницами без запроса на каждый."""
+        def get_post_page(url):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.authorized_client1.get(url)
+            return response, len(queries)
+
+        Comment.objects.create(post=self.post, author=self.user1,
+                               text='Коммент')
+        _, few_queries = get_post_page(self.post_url)
+        authors = [User.objects.create(username=f'reader{num}')
+                   for num in range(24)]
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=author, text='Коммент')
+            for author in authors
+        )
+        response, many_queries = get_post_page(self.post_url)
+        page = response.context.get('comments_page')
+        self.assertEqual(len(response.context.get('comments')), 20)
+        # Полная страница добавляет разве что EXISTS на следующую
+        self.assertLessEqual(many_queries, few_queries + 1)
+        response = self.authorized_client1.get(
+            self.post_url + '?after=' + page.next_cursor)
+        self.assertEqual(len(response.context.get('comments')), 5)
+
+
+class AnonymousPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.user = User.objects.create(username=ct.USERNAME1)
+        self.post = Post.objects.create(text='Тестовый текст',
+                                        author=self.user)
+        self.post_url = reverse('post', args=[ct.USERNAME1, self.post.pk])
+
+    def test_conditional_get_returns_304_without_queries(self):
+        """Повторный визит гостя с ETag получает 304 без рендера."""
+        for url in (ct.INDEX, ct.PROFILE1, self.post_url):
+            response = self.guest_client.get(url)
+            self.assertTrue(response.has_header('Last-Modified'))
+            etag = response['ETag']
+            with CaptureQueriesContext(connection) as queries:
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(len(queries), 0)
+
+    def test_if_modified_since(self):
+        """Last-Modified берётся из даты самого свежего поста."""
+        response = self.guest_client.get(ct.INDEX)
+        response = self.guest_client.get(
+            ct.INDEX, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_comment_invalidates_post_page(self):
+        """Новый коммент сбрасывает кэш страницы поста."""
+        etag = self.guest_client.get(self.post_url)['ETag']
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='Свежий коммент')
+        response = self.guest_client.get(self.post_url,
+                                         HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Свежий коммент')
+
+    def test_authorized_users_bypass_cache(self):
+        """Авторизованные видят свою страницу, а не гостевую из кэша."""
+        self.guest_client.get(ct.INDEX)
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(ct.INDEX)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertContains(response, 'Новая запись')
+
+
+class SharedCacheTests(SimpleTestCase):
+    """Версию ленты, сменённую в одном процессе, видят остальные."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_production_bump_reaches_other_processes(self):
+        caches = {'default': dict(settings_production.CACHES['default'],
+                                  LOCATION=self.directory)}
+        with override_settings(CACHES=caches):
+            version = feed_version()
+            subprocess.run(
+                [sys.executable, '-c',
+                 'import django; django.setup(); '
+                 'from posts.cache import bump_feed_version; '
+                 'bump_feed_version()'],
+                cwd=settings.BASE_DIR, check=True,
+                env=dict(os.environ,
+                         DJANGO_SETTINGS_MODULE='yatube.settings_production',
+                         YATUBE_CACHE_DIR=self.directory))
+            self.assertNotEqual(feed_version(), version)
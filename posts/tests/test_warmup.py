@@ -0,0 +1,24 @@
+from django.test import SimpleTestCase
+
+from posts.metrics import registry
+from posts.warmup import COLD_START_METRIC, warm_up
+from yatube import settings_production
+
+
+class WarmUpTests(SimpleTestCase):
+    def setUp(self):
+        registry.clear()
+
+    def test_warm_up_compiles_templates_and_reports_cold_start(self):
+        """Прогрев компилирует все шаблоны и отдаёт время старта."""
+        summary = warm_up()
+        self.assertGreaterEqual(summary['templates'], 20)
+        self.assertEqual(summary['failed'], 0)
+        self.assertIn(f'{COLD_START_METRIC} {summary["cold_start"]}',
+                      registry.render())
+
+    def test_production_uses_cached_loader(self):
+        options = settings_production.TEMPLATES[0]['OPTIONS']
+        self.assertEqual(options['loaders'][0][0],
+                         'django.template.loaders.cached.Loader')
+        self.assertFalse(settings_production.TEMPLATES[0]['APP_DIRS'])
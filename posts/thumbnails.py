@@ -0,0 +1,111 @@
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    EMPTY_VALUE, KVStore as CachedDBKVStore,
+)
+from sorl.thumbnail.models import KVStore
+
+from .models import Post
+
+# Варианты миниатюр, которые нарезаются сразу при загрузке картинки
+VARIANTS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+
+
+def _thumbnail_file(image, variant):
+    """
+    Собирает ImageFile миниатюры так же, как это делает sorl.
+
+    Имя файла миниатюры зависит только от исходника и опций, поэтому
+    его можно посчитать, не открывая саму картинку.
+    """
+    geometry, options = VARIANTS[variant]
+    options = dict(options)
+    backend = default.backend
+    source = ImageFile(image)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage)
+
+
+def generate_thumbnails(post_id):
+    """Нарезает все варианты миниатюр картинки поста."""
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None or not post.image:
+        return
+    for geometry, options in VARIANTS.values():
+        get_thumbnail(post.image, geometry, **options)
+
+
+def thumbnail_url(image, variant='card'):
+    """
+    URL готовой миниатюры картинки.
+
+    Миниатюра в запросе не создаётся: если фоновая нарезка ещё не
+    закончилась, отдаётся URL исходной картинки.
+    """
+    if not image:
+        return ''
+    cached = default.kvstore.get(_thumbnail_file(image, variant))
+    if cached is None:
+        return image.url
+    return cached.url
+
+
+def _get_many_raw(keys):
+    """
+    Достаёт сырые записи key-value хранилища sorl пачкой.
+
+    Сначала один get_many из кэша, затем один запрос в базу за тем,
+    чего в кэше не нашлось. Найденное и отсутствующее кладётся в кэш
+    так же, как это делает сам sorl.
+    """
+    kvstore = default.kvstore
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(KVStore.objects.filter(key__in=missing)
+                     .values_list('key', 'value'))
+        fresh = {key: found.get(key, EMPTY_VALUE) for key in missing}
+        kvstore.cache.set_many(fresh,
+                               thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(fresh)
+    return {key: value for key, value in values.items()
+            if value and value != EMPTY_VALUE}
+
+
+def attach_thumbnails(posts, variant='card'):
+    """
+    Проставляет постам страницы thumbnail_url одним обращением к хранилищу.
+
+    Вместо отдельного похода в key-value хранилище на каждую карточку
+    записи всех миниатюр страницы достаются одним мульти-get'ом. Пока
+    миниатюра не готова, thumbnail_url указывает на исходную картинку.
+    """
+    posts = [post for post in posts if post.image]
+    if not posts:
+        return
+    if not isinstance(default.kvstore, CachedDBKVStore):
+        for post in posts:
+            post.thumbnail_url = thumbnail_url(post.image, variant)
+        return
+    keys = {post.pk: add_prefix(_thumbnail_file(post.image, variant).key)
+            for post in posts}
+    values = _get_many_raw(list(set(keys.values())))
+    for post in posts:
+        value = values.get(keys[post.pk])
+        if value is None:
+            post.thumbnail_url = post.image.url
+        else:
+            post.thumbnail_url = deserialize_image_file(value).url
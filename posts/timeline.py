@@ -0,0 +1,109 @@
+from collections import defaultdict
+
+from django.db import connection, transaction
+
+from .models import FeedEntry, Follow, Post
+
+BATCH_SIZE = 1000
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост в ленты всех подписчиков автора."""
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, post_id=post.pk, pub_date=post.pub_date)
+         for user_id in follower_ids),
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+
+
+def fan_out_posts(post_ids):
+    """Раскладывает пачку новых постов по лентам подписчиков одним запросом."""
+    if not post_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {FeedEntry._meta.db_table} '
+            f'(user_id, post_id, pub_date) '
+            f'SELECT f.user_id, p.id, p.pub_date '
+            f'FROM {Follow._meta.db_table} f JOIN {Post._meta.db_table} p '
+            f'ON p.author_id = f.author_id WHERE p.id IN ({placeholders})',
+            list(post_ids))
+
+
+def backfill_follow(user_id, author_id):
+    """Добавляет в ленту подписчика все посты автора."""
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'id', 'pub_date')
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts.iterator()),
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+
+
+def backfill_follows(pairs):
+    """Добавляет в ленты посты авторов для пачки новых подписок."""
+    followers = defaultdict(list)
+    for user_id, author_id in pairs:
+        followers[author_id].append(user_id)
+    posts = Post.objects.filter(author_id__in=followers).values_list(
+        'id', 'author_id', 'pub_date')
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, author_id, pub_date in posts.iterator()
+         for user_id in followers[author_id]),
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+
+
+def drop_follow(user_id, author_id):
+    """Убирает из ленты подписчика посты автора, от которого он отписался."""
+    FeedEntry.objects.filter(user_id=user_id,
+                             post__author_id=author_id).delete()
+
+
+def rebuild_timelines():
+    """
+    Полностью пересобирает ленты подписок по таблице Follow.
+
+    Ленты заполняются одним INSERT ... SELECT на стороне базы, без
+    выгрузки подписок и постов в Python. Возвращает число записей
+    в пересобранных лентах.
+    """
+    entries = FeedEntry._meta.db_table
+    follows = Follow._meta.db_table
+    posts = Post._meta.db_table
+    with transaction.atomic():
+        FeedEntry.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {entries} (user_id, post_id, pub_date) '
+                f'SELECT DISTINCT f.user_id, p.id, p.pub_date '
+                f'FROM {follows} f JOIN {posts} p '
+                f'ON p.author_id = f.author_id'
+            )
+    return FeedEntry.objects.count()
+
+
+def user_timeline(user):
+    """
+    Записи ленты подписок пользователя, новые сверху.
+
+    Запрос идёт только по FeedEntry и читается индексом
+    (user, pub_date, post) без сортировки; при равных датах порядок
+    задаёт id поста, он же второй ключ курсора.
+    """
+    return FeedEntry.objects.filter(user=user).order_by('-pub_date',
+                                                        '-post_id')
+
+
+def entry_posts(entries):
+    """Посты страницы ленты одной выборкой for_feed в порядке записей."""
+    entries = list(entries)
+    posts = Post.objects.for_feed().in_bulk(
+        [entry.post_id for entry in entries])
+    return [posts[entry.post_id] for entry in entries
+            if entry.post_id in posts]
@@ -1,17 +1,32 @@
 from django.urls import path
 
-from . import views
+from . import api, feeds, views
 
 
 urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='group_page'),
+    path('fragment/', views.index_fragment, name='index_fragment'),
+    path('group/<slug:slug>/fragment/', views.group_fragment,
+         name='group_fragment'),
     path('new/', views.new_post, name='new_post'),
+    path('feed/', feeds.posts_feed, name='posts_feed'),
+    path('group/<slug:slug>/feed/', feeds.group_feed, name='group_feed'),
+    path('search/', views.search, name='search'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
     path('<str:username>/<int:post_id>/edit/', views.post_edit,
          name='post_edit'),
     path('404/', views.page_not_found, name='404'),
     path('500/', views.server_error, name='500'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('api/v1/posts/', api.index, name='api_index'),
+    path('api/v1/posts/<int:post_id>/', api.post_view, name='api_post'),
+    path('api/v1/groups/<slug:slug>/', api.group_posts, name='api_group'),
+    path('api/v1/authors/<str:username>/', api.profile,
+         name='api_profile'),
+    path('api/v1/follow/', api.follow_index, name='api_follow'),
+    path('api/v1/follow/import/', api.follow_import,
+         name='api_follow_import'),
     path("<str:username>/<int:post_id>/comment/", views.add_comment,
          name='add_comment'),
     path("follow/", views.follow_index, name='follow_index'),
@@ -19,5 +34,8 @@ urlpatterns = [
          name='profile_follow'),
     path("<str:username>/unfollow/", views.profile_unfollow,
          name='profile_unfollow'),
+    path('<str:username>/feed/', feeds.author_feed, name='author_feed'),
+    path('<str:username>/fragment/', views.profile_fragment,
+         name='profile_fragment'),
     path('<str:username>/', views.profile, name='profile'),
 ]
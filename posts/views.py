@@ -2,29 +2,133 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.utils.http import urlencode
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef
+from django.views.decorators.http import require_POST
 
 
 from .models import Post, Group, Follow
+from .follows import follow, unfollow
 from .forms import PostForm, CommentForm
+from .pagination import CursorPaginator, encode_cursor, feed_count
+from .replicas import replica_reads
+from .cache import anonymous_page_cache, feed_version
+from .metrics import registry
+from .search import search_posts
+from .stats import get_stats
+from .tasks import run_in_background
+from .thumbnails import attach_thumbnails, generate_thumbnails
+from .timeline import entry_posts, user_timeline
 
 User = get_user_model()
 COUNT_PAGE_POSTS = 10
+COUNT_PAGE_COMMENTS = 20
 
 
-def index(request):
+def newest_post(**filters):
+    """Дата самого свежего поста среди отобранных filters."""
+    posts = Post.objects.filter(**filters)
+    return posts.aggregate(newest=Max('pub_date'))['newest']
+
+
+def index_modified(request):
+    return newest_post()
+
+
+def group_modified(request, slug):
+    return newest_post(group__slug=slug)
+
+
+def profile_modified(request, username):
+    return newest_post(author__username=username)
+
+
+def post_modified(request, username, post_id):
+    """Дата поста или самого свежего коммента к нему."""
+    dates = Post.objects.filter(pk=post_id).aggregate(
+        post=Max('pub_date'), comment=Max('comments__created'))
+    return max(filter(None, dates.values()), default=None)
+
+
+def paginate(request, post_list, count_scopes, estimate_count=False,
+             tiebreak='pk', load=None):
     """
-    Вью главной страницы.
+    Разбивает ленту постов на страницы.
+
+    С параметром ?after= или ?before= (даже пустым) включается курсорная
+    пагинация, иначе обычная постраничная с номерами страниц. Число
+    постов для номеров страниц берётся из кэша версий лент count_scopes
+    (см. feed_count), а не считается COUNT(*) на каждый запрос. Миниатюры
+    всех постов страницы достаются одним запросом. next_cursor — курсор
+    за последним постом страницы, с него бесконечная лента подгружает
+    продолжение. Если post_list — записи ленты, а не посты, load
+    превращает записи страницы в посты, а tiebreak задаёт второй ключ
+    курсора.
+    """
+    if 'after' in request.GET or 'before' in request.GET:
+        paginator = CursorPaginator(post_list, COUNT_PAGE_POSTS,
+                                    tiebreak=tiebreak)
+        page = paginator.get_page(after=request.GET.get('after'),
+                                  before=request.GET.get('before'))
+    else:
+        paginator = Paginator(post_list, COUNT_PAGE_POSTS)
+        paginator.count = feed_count(post_list, count_scopes,
+                                     estimate_count)
+        page_number = request.GET.get('page')
+        page = paginator.get_page(page_number)
+    if load is not None:
+        page.object_list = load(page.object_list)
+    attach_thumbnails(page.object_list)
+    if getattr(page, 'is_cursor', False):
+        next_cursor = page.next_cursor
+    else:
+        next_cursor = encode_cursor(page[-1]) if page.has_next() else None
+    return {'paginator': paginator, 'page': page, 'next_cursor': next_cursor}
+
+
+def post_list_fragment(request, post_list):
+    """
+    Следующая порция карточек постов для бесконечной ленты.
 
-    Выводит все посты, разбивая по страницам.
+    Отдаёт только карточки без base.html, курсор следующей порции
+    уходит в заголовке X-Next-Cursor, на последней порции его нет.
     """
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, COUNT_PAGE_POSTS)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'index.html', {'paginator': paginator,
-                                          'page': page})
+    paginator = CursorPaginator(post_list, COUNT_PAGE_POSTS)
+    page = paginator.get_page(after=request.GET.get('after'))
+    attach_thumbnails(page.object_list)
+    response = render(request, 'includes/post_list.html', {'page': page})
+    if page.next_cursor:
+        response['X-Next-Cursor'] = page.next_cursor
+    return response
 
 
+@replica_reads
+@anonymous_page_cache(index_modified)
+def index(request):
+    """
+    Вью главной страницы.
+
+    Выводит все посты, разбивая по страницам. Лента кэшируется
+    с учётом страницы и пользователя, кэш сбрасывается сменой версии
+    ленты при изменении постов.
+    """
+    post_list = Post.objects.for_feed()
+    page_key = '|'.join(request.GET.get(param, '')
+                        for param in ('page', 'after', 'before'))
+    return render(request, 'index.html', {
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
+        'feed_version': feed_version(),
+        'page_key': page_key,
+        **paginate(request, post_list, ('index',), estimate_count=True),
+    })
+
+
+@replica_reads
+@anonymous_page_cache(group_modified)
 def group_posts(request, slug):
     """
     Вью групп.
@@ -32,12 +136,40 @@ def group_posts(request, slug):
     Выводит посты относящиеся к одной группе, разбивая по страницам.
     """
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, COUNT_PAGE_POSTS)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'group.html', {'paginator': paginator,
-                                          'group': group, 'page': page})
+    post_list = group.posts.for_feed()
+    pages = paginate(request, post_list, (f'group:{group.pk}',))
+    return render(request, 'group.html', {'group': group, **pages})
+
+
+@replica_reads
+def index_fragment(request):
+    """Порция постов главной страницы после курсора ?after=."""
+    return post_list_fragment(request, Post.objects.for_feed())
+
+
+@replica_reads
+def group_fragment(request, slug):
+    """Порция постов группы после курсора ?after=."""
+    group = get_object_or_404(Group, slug=slug)
+    return post_list_fragment(request, group.posts.for_feed())
+
+
+def search(request):
+    """
+    Вью поиска по постам.
+
+    Ищет по полнотекстовому индексу, самые релевантные посты сверху,
+    страницы листаются курсором.
+    """
+    query = request.GET.get('q', '').strip()
+    page = search_posts(query, COUNT_PAGE_POSTS,
+                        after=request.GET.get('after'))
+    attach_thumbnails(page.object_list)
+    return render(request, 'search.html', {
+        'query': query,
+        'page': page,
+        'extra_query': urlencode({'q': query}),
+    })
 
 
 @login_required
@@ -48,9 +180,10 @@ def new_post(request):
     Выводит форму создания нового поста, при успешном создании переадресует
     на главную, страница не доступна неавторизированным пользователям.
     Использует один шаблон с вью редактирования поста, text_form
-    передаёт нужный контест для оформления формы.
+    передаёт нужный контест для оформления формы. Миниатюры картинки
+    нарезаются в фоне сразу после сохранения.
     """
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     text_form = {
         'head': 'Добавить запись',
         'button': 'Добавить'
@@ -60,66 +193,78 @@ def new_post(request):
         post_data = form.save(commit=False)
         post_data.author = request.user
         post_data.save()
+        if post_data.image:
+            run_in_background(generate_thumbnails, post_data.pk)
         return redirect('index')
 
     return render(request, 'new_post.html', {'text_form': text_form,
                                              'form': form})
 
 
+@replica_reads
+@anonymous_page_cache(profile_modified)
 def profile(request, username):
     """
     Вью профиля авторов.
 
     Выводит все посты автора, разбивая по страницам. Так же статистику
-    автора: число постов, число подписок, число подписчиков. Кнопка
-    подписаться недоступна себе и неавторизованным пользователям.
+    автора: число постов, число подписок, число подписчиков из UserStats,
+    автор со счётчиками и признаком подписки достаётся одним запросом.
+    Кнопка подписаться недоступна себе и неавторизованным пользователям.
     """
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    paginator = Paginator(post_list, COUNT_PAGE_POSTS)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    post_count = post_list.count()
-    following_count = author.following.count()
-    follower_count = author.follower.count()
-    some_counts = {
-        'post_count': post_count,
-        'following_count': following_count,
-        'follower_count': follower_count,
-    }
-    if str(request.user) != 'AnonymousUser' \
-            and str(request.user) != str(author):
-        following = author.following.filter(user=request.user).count()
-        return render(request, 'profile.html', {'author': author,
-                                                'page': page,
-                                                'following': following,
-                                                'some_counts': some_counts,
-                                                'paginator': paginator})
-    following = 2
+    authors = User.objects.select_related('stats')
+    if request.user.is_authenticated:
+        authors = authors.annotate(is_followed=Exists(
+            Follow.objects.filter(user=request.user, author=OuterRef('pk'))
+        ))
+    author = get_object_or_404(authors, username=username)
+    post_list = author.posts.for_feed()
+    pages = paginate(request, post_list, (f'author:{author.pk}',))
+    stats = get_stats(author)
+    if request.user.is_authenticated and request.user != author:
+        following = int(author.is_followed)
+    else:
+        following = 2
     return render(request, 'profile.html', {'author': author,
-                                            'page': page,
                                             'following': following,
-                                            'some_counts': some_counts,
-                                            'paginator': paginator})
+                                            'stats': stats,
+                                            **pages})
+
+
+@replica_reads
+def profile_fragment(request, username):
+    """Порция постов автора после курсора ?after=."""
+    author = get_object_or_404(User, username=username)
+    return post_list_fragment(request, author.posts.for_feed())
 
 
+@replica_reads
+@anonymous_page_cache(post_modified)
 def post_view(request, username, post_id):
     """
     Вью выбранного поста.
 
     Выводит пост, комменты к нему, форму написания нового коммента.
-    read_button отключает кнопку комментарии в шаблоне поста.
+    Комменты разбиты на страницы курсором по дате, авторы подтягиваются
+    тем же запросом. read_button отключает кнопку комментарии в шаблоне
+    поста.
     """
     form = CommentForm(request.POST or None)
-    author = get_object_or_404(User, username=username)
-    post = get_object_or_404(Post, author=author, id=post_id)
-    post_count = author.posts.count()
-    comments = post.comments.all()
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    post = get_object_or_404(Post.objects.for_feed(), author=author,
+                             id=post_id)
+    post_count = get_stats(author).post_count
+    paginator = CursorPaginator(post.comments.for_post(),
+                                COUNT_PAGE_COMMENTS, field='created')
+    comments_page = paginator.get_page(after=request.GET.get('after'),
+                                       before=request.GET.get('before'))
     read_button = 1
     return render(request, 'post.html', {'author': author,
                                          'post_count': post_count,
                                          'post': post,
-                                         'comments': comments,
+                                         'comments': comments_page.object_list,
+                                         'comments_page': comments_page,
                                          'form': form,
                                          'read_button': read_button})
 
@@ -144,7 +289,9 @@ def post_edit(request, username, post_id):
         return redirect('post', username, post_id)
 
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data and post.image:
+            run_in_background(generate_thumbnails, post.pk)
         return redirect('post', username, post_id)
 
     return render(request, 'new_post.html', {'text_form': text_form,
@@ -157,7 +304,8 @@ def add_comment(request, username, post_id):
     """
     Вью формы написания комментов к посту.
 
-    Форма доступна для аторизованных пользователей.
+    Форма доступна для аторизованных пользователей. Счётчик комментариев
+    поста увеличивает сигнал count_comment.
     """
     author = get_object_or_404(User, username=username)
     post = get_object_or_404(Post, author=author, id=post_id)
@@ -167,13 +315,15 @@ def add_comment(request, username, post_id):
         post_data = form.save(commit=False)
         post_data.author = request.user
         post_data.post = post
-        post_data.save()
+        # Комментарий и счётчик из сигнала сохраняются вместе
+        with transaction.atomic():
+            post_data.save()
         return redirect('post', username, post_id)
 
     return render(request, 'post.html')
 
 
-def page_not_found(request, exception):
+def page_not_found(request, exception=None):
     return render(request, 'misc/404.html', {'path': request.path}, status=404)
 
 
@@ -181,48 +331,68 @@ def server_error(request):
     return render(request, 'misc/500.html', status=500)
 
 
+def metrics_allowed(request):
+    """
+    Пускает к /metrics/ по токену METRICS_TOKEN или по адресу.
+
+    Адрес из METRICS_ALLOWED_IPS сверяется с REMOTE_ADDR и за обратным
+    прокси ничего не защищает, там нужен токен.
+    """
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and constant_time_compare(header, f'Bearer {token}'):
+        return True
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+def metrics(request):
+    """Гистограммы запросов для Prometheus, только доверенным сборщикам."""
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(),
+                        content_type='text/plain; version=0.0.4')
+
+
 @login_required()
+@replica_reads
 def follow_index(request):
     """
     Вью постов составленных из подписок.
 
     Страница доступна только авторизованным пользователям, разбита
-    на страницы.
+    на страницы. Страница ленты выбирается из материализованной ленты
+    FeedEntry, а её посты дочитываются одним запросом.
     """
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, COUNT_PAGE_POSTS)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'follow.html', {'page': page,
-                                           'paginator': paginator})
+    # Лента подписок меняется с любым новым постом её авторов, поэтому
+    # число записей держится на версии всех постов и версии подписок
+    return render(request, 'follow.html', paginate(
+        request, user_timeline(request.user),
+        ('index', f'follow:{request.user.pk}'), tiebreak='post_id',
+        load=entry_posts))
 
 
 @login_required()
+@require_POST
 def profile_follow(request, username):
     """
     Вью кнопки подписаться на странице профиля.
 
-    Доступна только если пользовательне подписан.
+    Только POST. Повторная подписка и подписка на себя ничего не меняют,
+    дубль отсекает уникальный индекс.
     """
     author = get_object_or_404(User, username=username)
-    follow = request.user.follower.filter(author=author).count()
-    if request.user != author and follow == 0:
-        Follow.objects.create(
-            user=request.user,
-            author=author
-        )
-        return redirect('profile', username)
+    follow(request.user.pk, author.pk)
     return redirect('profile', username)
 
 
 @login_required()
+@require_POST
 def profile_unfollow(request, username):
     """
     Вью кнопки отписаться на странице профиля.
 
-    Кнопка доступна только пользователям, подписанным на автора.
+    Только POST, повторная отписка ничего не меняет.
     """
     author = get_object_or_404(User, username=username)
-    user = request.user
-    Follow.objects.filter(user=user, author=author).delete()
+    unfollow(request.user.pk, author.pk)
     return redirect('profile', username)
@@ -37,7 +37,7 @@ ALLOWED_HOSTS = ["localhost",
 INSTALLED_APPS = [
     'about',
     'users',
-    'posts',
+    'posts.apps.PostsConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -50,6 +50,8 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    'posts.middleware.PerformanceMiddleware',
+    'posts.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -69,7 +71,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'posts.metrics.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -97,6 +99,24 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения ленты: YATUBE_REPLICAS=2 добавляет базы replica1 и
+# replica2, которые заполняет команда replicate. В тестах они смотрят
+# в ту же тестовую базу, что и default. Реплики требуют общего для всех
+# процессов кэша (см. CACHES ниже и в settings_production): команда
+# replicate сбрасывает им версии лент из своего процесса.
+for num in range(1, int(os.environ.get('YATUBE_REPLICAS', 0)) + 1):
+    DATABASES[f'replica{num}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db.replica{num}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['posts.replicas.ReplicaRouter']
+# Прагмы каждого соединения SQLite, боевые — в settings_production
+SQLITE_PRAGMAS = {}
+# Сколько секунд после записи пользователь читает с основной базы
+REPLICA_PIN_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -144,8 +164,28 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 LOGIN_URL = "/auth/login/"
 LOGIN_REDIRECT_URL = "index"
 
-'''CACHES = {
+# Версия ленты (posts.cache) хранится в кэше, и её сменой все процессы
+# узнают о новых постах. LocMemCache у каждого процесса свой, он годится
+# только для разработки с одним процессом; боевые воркеры и команды
+# manage.py должны делить один кэш (см. settings_production).
+CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
-}'''
+}
+
+# Кэш ленты сбрасывается при изменении постов, поэтому живёт подольше
+FEED_CACHE_TIMEOUT = 60 * 5
+
+# Потоки для фоновых задач (нарезка миниатюр), 0 — выполнять сразу
+BACKGROUND_WORKERS = 2
+# Тесты выполняют фоновые задачи сразу (BACKGROUND_WORKERS = 0)
+TEST_RUNNER = 'yatube.test_runner.TestRunner'
+
+# Доступ к /metrics/ (сборщик Prometheus). Сборщик с токеном присылает
+# его в заголовке «Authorization: Bearer <токен>». Список адресов
+# проверяет REMOTE_ADDR и годится только без обратного прокси: за ним
+# все запросы приходят с адреса прокси, и /metrics/ стал бы публичным.
+# Боевые значения — в settings_production.
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = ['127.0.0.1']
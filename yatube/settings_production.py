@@ -0,0 +1,59 @@
+"""
+Настройки боевого окружения поверх yatube.settings.
+
+Запуск: DJANGO_SETTINGS_MODULE=yatube.settings_production.
+"""
+import copy
+import os
+
+from .settings import *  # noqa: F401, F403
+from .settings import BASE_DIR, DATABASES, TEMPLATES
+
+DEBUG = False
+
+# Соединение с базой живёт между запросами воркера, а не открывается
+# заново на каждый запрос.
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = 600
+
+# Общий для всех воркеров и команд manage.py кэш: версию ленты, которую
+# меняет запись в одном процессе, должны видеть все остальные, иначе они
+# до FEED_CACHE_TIMEOUT отдают устаревшие страницы. Файловый кэш не
+# требует отдельного сервера; воркеры на нескольких машинах должны
+# смотреть в общий memcached или redis.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('YATUBE_CACHE_DIR',
+                                   os.path.join(BASE_DIR, 'cache')),
+    }
+}
+
+# За обратным прокси все запросы приходят с его адреса, поэтому /metrics/
+# отдаётся только по токену YATUBE_METRICS_TOKEN, без списка адресов.
+METRICS_ALLOWED_IPS = []
+
+# Прагмы каждого соединения SQLite (см. posts.db.apply_sqlite_pragmas).
+# WAL пускает читателей параллельно с писателем, NORMAL не ждёт fsync
+# на каждом коммите, busy_timeout ждёт блокировку вместо ошибки
+# «database is locked». Сравнить с настройками по умолчанию:
+# ./manage.py bench_sqlite --settings=yatube.settings_production
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,  # в КиБ, то есть 64 МБ
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,  # мс
+}
+
+# Шаблоны компилируются один раз на воркер и живут в памяти, а не
+# перечитываются с диска на каждый рендер. yatube/wsgi.py компилирует их
+# все до первого запроса (см. posts.warmup).
+TEMPLATES = copy.deepcopy(TEMPLATES)
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
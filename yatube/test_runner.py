@@ -0,0 +1,21 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Запускает тесты с фоновыми задачами без пула потоков.
+
+    С BACKGROUND_WORKERS = 0 задачи выполняются сразу после коммита в том
+    же потоке: потоки пула работали бы с тестовой базой SQLite в памяти
+    параллельно с тестом и упирались бы в её табличные блокировки.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._inline_tasks = override_settings(BACKGROUND_WORKERS=0)
+        self._inline_tasks.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._inline_tasks.disable()
+        super().teardown_test_environment(**kwargs)
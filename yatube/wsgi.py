@@ -1,7 +1,16 @@
 import os
+import time
 
 from django.core.wsgi import get_wsgi_application
 
+started = time.perf_counter()
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Реестр приложений загружен, осталось разобрать URLconf и шаблоны,
+# чтобы их не разбирали первые запросы после рестарта воркера.
+from posts.warmup import warm_up  # noqa: E402
+
+warm_up(started)